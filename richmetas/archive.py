@@ -0,0 +1,116 @@
+import fcntl
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Optional
+
+from richmetas.records import loads
+
+SEGMENT_SIZE = 10000
+ENTRY = struct.Struct('<QI')
+
+
+class Segment:
+    def __init__(self, path: Path):
+        self._path = path
+        self._index_path = path.with_suffix('.idx')
+        self._data: Optional[mmap.mmap] = None
+        self._index: Optional[mmap.mmap] = None
+
+    def entry(self, slot: int) -> tuple[int, int]:
+        index = self._map_index()
+        if index is None:
+            return 0, 0
+
+        return ENTRY.unpack_from(index, slot * ENTRY.size)
+
+    def read(self, offset: int, length: int) -> memoryview:
+        if self._data is None or len(self._data) < offset + length:
+            if self._data is not None:
+                self._data.close()
+            with open(self._path, 'rb') as f:
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return memoryview(self._data)[offset:offset + length]
+
+    def append(self, slot: int, frame: bytes) -> tuple[int, int]:
+        with open(self._path, 'ab') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                offset = f.seek(0, os.SEEK_END)
+                f.write(frame)
+                ENTRY.pack_into(self._map_index(create=True), slot * ENTRY.size, offset, len(frame))
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+        return offset, len(frame)
+
+    def sync(self):
+        with open(self._path, 'rb') as f:
+            os.fsync(f.fileno())
+        if self._index is not None:
+            self._index.flush()
+
+    def close(self):
+        for m in [self._data, self._index]:
+            if m is not None:
+                m.close()
+        self._data = self._index = None
+
+    def _map_index(self, create: bool = False) -> Optional[mmap.mmap]:
+        if self._index is None:
+            if not create and not self._index_path.exists():
+                return None
+
+            with open(self._index_path, 'a+b') as f:
+                if f.seek(0, os.SEEK_END) < SEGMENT_SIZE * ENTRY.size:
+                    f.truncate(SEGMENT_SIZE * ENTRY.size)
+                self._index = mmap.mmap(f.fileno(), 0)
+
+        return self._index
+
+
+class Archive:
+    def __init__(self, root: Path, level: int = 3):
+        import zstandard
+
+        self._root = root
+        self._root.mkdir(parents=True, exist_ok=True)
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._decompressor = zstandard.ZstdDecompressor()
+        self._segments = {}
+        self._dirty = set()
+
+    def append(self, block_number: int, document: dict) -> str:
+        segment, slot = divmod(block_number, SEGMENT_SIZE)
+        self._dirty.add(segment)
+        offset, length = self._segment(segment).append(
+            slot, self._compressor.compress(json.dumps(document).encode()))
+
+        return f'{segment}:{offset}:{length}'
+
+    def read(self, block_number: int) -> Optional[dict]:
+        segment, slot = divmod(block_number, SEGMENT_SIZE)
+        offset, length = self._segment(segment).entry(slot)
+        if not length:
+            return None
+
+        return loads(self._decompressor.decompress(self._segment(segment).read(offset, length)))
+
+    def sync(self):
+        for segment in self._dirty:
+            self._segments[segment].sync()
+        self._dirty.clear()
+
+    def close(self):
+        for segment in self._segments.values():
+            segment.close()
+        self._segments.clear()
+
+    def _segment(self, segment: int) -> Segment:
+        if segment not in self._segments:
+            self._segments[segment] = Segment(self._root / f'{segment:08d}.seg')
+
+        return self._segments[segment]
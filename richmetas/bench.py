@@ -0,0 +1,182 @@
+import asyncio
+import hashlib
+import logging
+import resource
+import statistics
+import time
+from typing import Optional
+
+from aiohttp import web
+from services.external_api.base_client import RetryConfig
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from richmetas.crawl import Crawler, open_ndjson
+from richmetas.models import Base
+from richmetas.records import loads
+from richmetas.scheduler import Budget, Lane
+from richmetas.transport import PooledFeederGatewayClient, Transport
+
+CONTRACTS = 100
+
+
+def felt(*seed) -> str:
+    return hex(int.from_bytes(hashlib.sha256(repr(seed).encode()).digest()[:31], 'big'))
+
+
+def synthesize(block_number: int, transactions: int, calldata: int) -> dict:
+    hashes = [felt('transaction', block_number, i) for i in range(transactions)]
+
+    return {
+        'block_number': block_number,
+        'block_hash': felt('block', block_number),
+        'parent_block_hash': felt('block', block_number - 1) if block_number else '0x0',
+        'timestamp': 1640000000 + block_number,
+        'status': 'ACCEPTED_ON_L1',
+        'transactions': [
+            {
+                'transaction_hash': tx_hash,
+                'type': 'INVOKE_FUNCTION',
+                'contract_address': felt('contract', (block_number + i) % CONTRACTS),
+                'entry_point_selector': felt('selector', i % 7),
+                'entry_point_type': 'EXTERNAL',
+                'calldata': [str(block_number * calldata + j) for j in range(calldata)],
+            }
+            for i, tx_hash in enumerate(hashes)],
+        'transaction_receipts': [
+            {
+                'transaction_hash': tx_hash,
+                'transaction_index': i,
+                'l2_to_l1_messages': [],
+            }
+            for i, tx_hash in enumerate(hashes)],
+    }
+
+
+def renumber(documents: list[dict]) -> list[dict]:
+    renumbered = []
+    for i, document in enumerate(documents):
+        renumbered.append({
+            **document,
+            'block_number': i,
+            'block_hash': felt('block', i),
+            'parent_block_hash': felt('block', i - 1) if i else '0x0',
+        })
+
+    return renumbered
+
+
+class Fixture:
+    def __init__(self, documents: list[dict], latency: float):
+        self._documents = documents
+        self._hashes = {document['block_hash']: document['block_number'] for document in documents}
+        self._latency = latency
+        self._runner: Optional[web.AppRunner] = None
+        self.url = None
+
+    async def start(self, port: int = 0):
+        app = web.Application()
+        app.add_routes([web.get('/feeder_gateway/get_block', self._get_block)])
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, '127.0.0.1', port).start()
+        self.url = 'http://%s:%d' % self._runner.addresses[0][:2]
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+    async def _get_block(self, request: web.Request):
+        await asyncio.sleep(self._latency)
+        if 'blockHash' in request.query:
+            block_number = self._hashes.get(request.query['blockHash'], -1)
+        elif request.query.get('blockNumber', 'null') == 'null':
+            block_number = len(self._documents) - 1
+        elif request.query['blockNumber'].isdigit():
+            block_number = int(request.query['blockNumber'])
+        else:
+            block_number = -1
+
+        if not 0 <= block_number < len(self._documents):
+            return web.json_response({'code': 'StarknetErrorCode.BLOCK_NOT_FOUND'}, status=500)
+
+        return web.json_response(self._documents[block_number])
+
+
+class BenchCrawler(Crawler):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.started = {}
+        self.latencies = []
+
+    async def _fetch(self, block_number: int, lane: Lane):
+        self.started[block_number] = time.perf_counter()
+
+        return await super()._fetch(block_number, lane)
+
+    async def _persist(self, documents: list[dict], replace: bool = False):
+        await super()._persist(documents, replace)
+        persisted = time.perf_counter()
+        for document in documents:
+            self.latencies.append(persisted - self.started.pop(document['block_number']))
+
+    async def measure(self, block_number: int):
+        await self._block_cache.load()
+        await self._backfill(block_number)
+
+
+async def bench(
+        database_url: str,
+        documents: list[dict],
+        latency: float,
+        concurrency: int,
+        batch_size: int,
+        rate: Optional[float],
+        burst: int) -> dict:
+    engine = create_async_engine(make_url(database_url).set(drivername='postgresql+asyncpg'))
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+        await connection.execute(text(
+            'TRUNCATE pending_transaction, transaction, block, stark_contract, crawl_checkpoint CASCADE'))
+
+    fixture = Fixture(documents, latency)
+    await fixture.start()
+    transport = Transport(limit=concurrency)
+    crawler = BenchCrawler(
+        PooledFeederGatewayClient(transport, url=fixture.url, retry_config=RetryConfig(n_retries=1)),
+        sessionmaker(engine, expire_on_commit=False, class_=AsyncSession),
+        0,
+        concurrency,
+        batch_size,
+        budget=Budget(rate, burst) if rate else None)
+    level = logging.getLogger().level
+    logging.getLogger().setLevel(logging.ERROR)
+    try:
+        started = time.perf_counter()
+        await crawler.measure(len(documents))
+        seconds = time.perf_counter() - started
+    finally:
+        logging.getLogger().setLevel(level)
+        await transport.close()
+        await fixture.stop()
+        await engine.dispose()
+
+    rows = sum(1 + len(document['transactions']) for document in documents)
+    quantiles = statistics.quantiles(crawler.latencies, n=100) if len(crawler.latencies) > 1 else \
+        crawler.latencies * 99
+
+    return dict(
+        blocks=len(documents),
+        rows=rows,
+        seconds=seconds,
+        blocks_per_second=len(documents) / seconds,
+        rows_per_second=rows / seconds,
+        p50=quantiles[49],
+        p99=quantiles[98],
+        peak_rss=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024)
+
+
+def load_documents(path: str) -> list[dict]:
+    with open_ndjson(path, 'rt') as f:
+        return renumber([*map(loads, f)])
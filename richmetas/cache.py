@@ -0,0 +1,131 @@
+import hashlib
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Hashable, Optional
+
+SHARDS = 256
+LOW_WATERMARK = 0.75
+
+
+class DiskCache:
+    def __init__(self, root: Path, ttl: float, max_size: int):
+        self._entries = root / 'entries'
+        self._ttl = ttl
+        self._max_size = max_size
+        self._sizes: dict[Path, int] = {}
+        self._entries.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entry(key)
+        try:
+            with entry.open() as f:
+                expires = f.readline().strip()
+                if expires != '-' and float(expires) < time.time():
+                    entry.unlink(missing_ok=True)
+                    return None
+
+                text = f.read()
+            os.utime(entry)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        return text
+
+    def put(self, key: str, text: str, final: bool):
+        entry = self._entry(key)
+        shard = entry.parent
+        if shard not in self._sizes:
+            shard.mkdir(exist_ok=True)
+            self._sizes[shard] = sum(size for _, size, _ in self._scan(shard))
+
+        content = f"{'-' if final else time.time() + self._ttl}\n{text}"
+        self._write(entry, content)
+
+        self._sizes[shard] += len(content.encode())
+        if self._sizes[shard] > self._max_size // SHARDS:
+            self.evict(shard)
+
+    def evict(self, shard: Path):
+        # Keys hash uniformly over the shards, so holding each shard to its share of max_size bounds the
+        # whole cache while a pass only scans the shard that outgrew it.
+        entries = self._scan(shard)
+        size = sum(size for _, size, _ in entries)
+        for _, entry_size, entry in sorted(entries):
+            if size <= self._max_size // SHARDS * LOW_WATERMARK:
+                break
+
+            entry.unlink(missing_ok=True)
+            size -= entry_size
+        self._sizes[shard] = size
+
+    @staticmethod
+    def _scan(shard: Path) -> list[tuple[float, int, Path]]:
+        entries = []
+        for entry in shard.iterdir():
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+
+        return entries
+
+    def _entry(self, key: str) -> Path:
+        digest = hashlib.sha256(key.encode()).hexdigest()
+
+        return self._entries / digest[:2] / digest
+
+    @staticmethod
+    def _write(path: Path, text: str):
+        fd, temp = tempfile.mkstemp(dir=path.parent)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(text)
+            os.replace(temp, path)
+        except BaseException:
+            os.unlink(temp)
+            raise
+
+
+class LRUCache:
+    def __init__(self, max_size: int, ttl: Optional[float] = None):
+        self._entries: OrderedDict[Hashable, tuple[Any, Optional[float]]] = OrderedDict()
+        self._max_size = max_size
+        self._ttl = ttl
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        try:
+            value, expires = self._entries[key]
+        except KeyError:
+            return None
+
+        if expires is not None and expires < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        if self.get(key) is not None:
+            _, expires = self._entries[key]
+        else:
+            expires = time.monotonic() + self._ttl if self._ttl is not None else None
+        self._entries[key] = value, expires
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
@@ -0,0 +1,64 @@
+from collections import namedtuple
+from typing import Optional, Union
+
+from starkware.starknet.public.abi import get_selector_from_name
+
+from richmetas.utils import parse_int
+
+EXTERNAL = 'EXTERNAL'
+L1_HANDLER = 'L1_HANDLER'
+WITHDRAW = 0
+
+
+class EntryPoint:
+    __slots__ = ('name', 'selector', 'type', 'record')
+
+    def __init__(self, name: str, inputs: list[str], type_: str = EXTERNAL):
+        self.name = name
+        self.selector = get_selector_from_name(name)
+        self.type = type_
+        self.record = namedtuple(f"{''.join(map(str.capitalize, name.split('_')))}Call", inputs)
+
+    def decode(self, calldata: list[Union[int, str]]):
+        return self.record._make(map(parse_int, calldata))
+
+    def encode(self, *args, **kwargs) -> list[int]:
+        return [*map(parse_int, self.record(*args, **kwargs))]
+
+
+class Message:
+    __slots__ = ('record',)
+
+    def __init__(self, name: str, fields: list[str]):
+        self.record = namedtuple(name, fields)
+
+    def decode(self, payload: list[Union[int, str]]):
+        return self.record._make(map(parse_int, payload))
+
+
+ENTRY_POINTS = {entry_point.name: entry_point for entry_point in [
+    EntryPoint('is_pause', []),
+    EntryPoint('describe', ['contract']),
+    EntryPoint('get_client', ['address']),
+    EntryPoint('get_balance', ['user', 'contract']),
+    EntryPoint('get_owner', ['token_id', 'contract']),
+    EntryPoint('get_origin', ['token_id', 'contract']),
+    EntryPoint('get_order', ['id']),
+    EntryPoint('set_pause', ['paus_', 'nonce']),
+    EntryPoint('register_contract', ['from_address', 'contract', 'kind', 'mint'], L1_HANDLER),
+    EntryPoint('register_client', ['user', 'address', 'nonce']),
+    EntryPoint('mint', ['user', 'token_id', 'contract', 'nonce']),
+    EntryPoint('withdraw', ['user', 'amount_or_token_id', 'contract', 'address', 'nonce']),
+    EntryPoint('deposit', ['from_address', 'user', 'amount_or_token_id', 'contract', 'nonce'], L1_HANDLER),
+    EntryPoint('transfer', ['from_', 'to_', 'amount_or_token_id', 'contract', 'nonce']),
+    EntryPoint('create_order', [
+        'id', 'user', 'bid', 'base_contract', 'base_token_id', 'quote_contract', 'quote_amount']),
+    EntryPoint('fulfill_order', ['id', 'user', 'nonce']),
+    EntryPoint('cancel_order', ['id', 'nonce']),
+]}
+SELECTORS = {entry_point.selector: entry_point for entry_point in ENTRY_POINTS.values()}
+WITHDRAW_MESSAGE = Message('WithdrawMessage', ['kind', 'address', 'amount_or_token_id', 'contract', 'origin', 'nonce'])
+
+
+def lookup(selector: Optional[Union[int, str]]) -> Optional[EntryPoint]:
+    return SELECTORS.get(parse_int(selector)) if selector is not None else None
@@ -24,10 +24,14 @@ ERC721_METADATA_JSON_SCHEMA = {
 }
 
 
+ERC721_METADATA_VALIDATOR = jsonschema.validators.validator_for(ERC721_METADATA_JSON_SCHEMA)(
+    ERC721_METADATA_JSON_SCHEMA)
+
+
 class ERC721Metadata:
     @staticmethod
     def validate(instance):
-        jsonschema.validate(instance, ERC721_METADATA_JSON_SCHEMA)
+        ERC721_METADATA_VALIDATOR.validate(instance)
 
     def __init__(self, address: ChecksumAddress, w3: Web3):
         self.contract = w3.eth.contract(
@@ -4,13 +4,13 @@ from enum import IntEnum
 import pkg_resources
 from eth_typing import ChecksumAddress, HexStr
 from marshmallow import Schema, fields
-from starkware.starknet.public.abi import get_selector_from_name
 from starkware.starknet.services.api.feeder_gateway.feeder_gateway_client import FeederGatewayClient
 from starkware.starknet.services.api.gateway.gateway_client import GatewayClient
 from starkware.starknet.services.api.gateway.transaction import InvokeFunction
 from web3 import Web3
 
 from richmetas import utils
+from richmetas.contracts.entry_points import ENTRY_POINTS
 from richmetas.models import State
 from richmetas.utils import parse_int
 
@@ -64,6 +64,10 @@ class StarkRichmetas:
         self._feeder = feeder
         self._gateway = gateway
 
+    @property
+    def address(self) -> int:
+        return self._address
+
     async def get_client(self, address):
         stark_key, = await self._estimate('get_client', [address])
 
@@ -116,8 +120,10 @@ class StarkRichmetas:
         return response['transaction_hash']
 
     def _invoke(self, name, calldata, signature=None):
+        entry_point = ENTRY_POINTS[name]
+
         return InvokeFunction(
             contract_address=self._address,
-            entry_point_selector=get_selector_from_name(name),
-            calldata=list(map(parse_int, calldata)),
+            entry_point_selector=entry_point.selector,
+            calldata=entry_point.encode(*calldata),
             signature=signature or [])
@@ -1,162 +1,866 @@
 import asyncio
+import itertools
+import json
 import logging
-from datetime import datetime, timezone
+from collections import deque
+from collections.abc import Awaitable, Callable, Iterable, Iterator
+from pathlib import Path
+from typing import Optional
 
 import click
+from decouple import config
 from services.external_api.base_client import BadRequest
-from sqlalchemy import delete, select
-from sqlalchemy.exc import NoResultFound
+from sqlalchemy import Integer, JSON, bindparam, cast, delete, func, literal, null, or_, select, text, union_all, \
+    update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from starkware.starknet.services.api.feeder_gateway.feeder_gateway_client import FeederGatewayClient
 
-from richmetas.models import Block, Transaction, StarkContract
+from richmetas.archive import Archive
+from richmetas.intervals import IntervalSet
+from richmetas.models import Block, Transaction, StarkContract, CrawlCheckpoint, PendingTransaction
+from richmetas.models.Block import FINAL_STATUSES
+from richmetas.models.CrawlCheckpoint import CONTIGUOUS, HEAD
+from richmetas.models.Transaction import TYPE_DEPLOY
+from richmetas.records import BlockRecord, loads
+from richmetas.scheduler import Backoff, Budget, Lane
+from richmetas.transport import supervise
+from richmetas.utils import parse_int
+
+MAX_PARAMETERS = 32767
+FINALITY_BATCH_SIZE = 100
+PENDING_INTERVAL = 2
+SHARD_LOCK = 7001
+HEAD_LOCK = 7002
+CONFIRMED_STATUSES = ['PENDING', 'ACCEPTED_ON_L2', *FINAL_STATUSES]
 
 
 class BlockCache:
     def __init__(self, async_session: sessionmaker):
-        self._lo = -1
-        self._blocks = []
+        self._blocks = IntervalSet()
         self._async_session = async_session
+        self._watermark = -1
 
-    async def hit(self, block_number):
-        lo = int(block_number / 1000)
-        if self._lo != lo:
-            self._lo = lo
-            lo *= 1000
+    async def load(self):
+        async with self._async_session() as session:
+            self._watermark = (await session.execute(
+                select(CrawlCheckpoint.block_number).
+                where(CrawlCheckpoint.id == CONTIGUOUS))).scalar_one_or_none()
+            if self._watermark is None:
+                self._watermark = -1
+            self._blocks.add_range(0, self._watermark + 1)
+            await self._islands(session, Block.id > self._watermark)
+
+    async def refresh(self, lo: int, hi: int):
+        async with self._async_session() as session:
+            await self._islands(session, Block.id >= lo, Block.id < hi)
+
+    async def _islands(self, session: AsyncSession, *criteria):
+        blocks = select(
+            Block.id,
+            (Block.id - func.row_number().over(order_by=Block.id)).label('island')). \
+            where(*criteria). \
+            subquery()
+        for lo, hi in await session.execute(
+                select(func.min(blocks.c.id), func.max(blocks.c.id)).
+                group_by(blocks.c.island)):
+            self._blocks.add_range(lo, hi + 1)
+
+    async def gaps(self) -> list[tuple[int, int]]:
+        blocks = union_all(
+            select(cast(literal(self._watermark), Integer).label('id')),
+            select(Block.id).where(Block.id > self._watermark)).subquery()
+        successors = select(
+            blocks.c.id,
+            func.lead(blocks.c.id).over(order_by=blocks.c.id).label('successor')).subquery()
+        async with self._async_session() as session:
+            return [(lo, hi) for lo, hi in await session.execute(
+                select(successors.c.id + 1, successors.c.successor).
+                where(successors.c.successor > successors.c.id + 1).
+                order_by(successors.c.id))]
+
+    async def checkpoint(self):
+        watermark = next((hi - 1 for lo, hi in self._blocks if lo == 0), -1)
+        if watermark == self._watermark:
+            return
 
-            async with self._async_session() as session:
-                blocks = await session.execute(
-                    select(Block.id).
-                    where(lo <= Block.id).
-                    where(Block.id < lo + 1000))
-                self._blocks = [b for b, in blocks]
+        async with self._async_session() as session:
+            stored = (await session.execute(
+                select(CrawlCheckpoint.block_number).
+                where(CrawlCheckpoint.id == CONTIGUOUS).
+                with_for_update())).scalar_one_or_none()
+            stored = -1 if stored is None else stored
+            if watermark > stored:
+                blocks = union_all(
+                    select(cast(literal(stored), Integer).label('id')),
+                    select(Block.id).where(Block.id > stored).where(Block.id <= watermark)).subquery()
+                successors = select(
+                    blocks.c.id,
+                    func.lead(blocks.c.id).over(order_by=blocks.c.id).label('successor')).subquery()
+                watermark = (await session.execute(
+                    select(func.min(successors.c.id)).
+                    where(or_(successors.c.successor.is_(None),
+                              successors.c.successor > successors.c.id + 1)))).scalar_one()
+            if watermark > stored:
+                stmt = insert(CrawlCheckpoint).values(id=CONTIGUOUS, block_number=watermark)
+                await session.execute(stmt.on_conflict_do_update(
+                    index_elements=[CrawlCheckpoint.id],
+                    set_=dict(block_number=stmt.excluded.block_number)))
+            await session.commit()
+        self._watermark = max(watermark, stored)
+
+    async def retreat(self, session: AsyncSession, block_number: int):
+        await session.execute(
+            update(CrawlCheckpoint).
+            where(CrawlCheckpoint.id == CONTIGUOUS).
+            where(CrawlCheckpoint.block_number >= block_number).
+            values(block_number=block_number - 1))
+        self._watermark = min(self._watermark, block_number - 1)
 
+    def hit(self, block_number: int) -> bool:
         return block_number in self._blocks
 
+    def add(self, block_number: int):
+        self._blocks.add(block_number)
+
+    def discard(self, block_number: int):
+        self._blocks.discard(block_number)
+
+    def missing(self, stop: int, start: int = 0) -> Iterator[int]:
+        return self._blocks.missing(stop, start)
+
+
+class Leases:
+    def __init__(self, engine: AsyncEngine, key: int):
+        self._engine = engine
+        self._key = key
+        self._connection: Optional[AsyncConnection] = None
+
+    async def __aenter__(self):
+        self._connection = await (await self._engine.connect()).execution_options(isolation_level='AUTOCOMMIT')
+
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._connection.close()
+
+    async def try_acquire(self, n: int) -> bool:
+        return (await self._connection.execute(select(func.pg_try_advisory_lock(self._key, n)))).scalar_one()
+
+    async def release(self, n: int):
+        await self._connection.execute(select(func.pg_advisory_unlock(self._key, n)))
+
+
+class Watch:
+    def __init__(self, addresses: Iterable[str], selectors: Iterable[str] = ()):
+        from starkware.starknet.public.abi import get_selector_from_name
+
+        self._addresses = {parse_int(address) for address in addresses}
+        self._selectors = {
+            parse_int(selector) if selector.startswith('0x') else get_selector_from_name(selector)
+            for selector in selectors}
+
+    def __call__(self, transaction: dict) -> bool:
+        if parse_int(transaction['contract_address']) not in self._addresses:
+            return False
+
+        return not self._selectors or \
+            transaction['type'] == TYPE_DEPLOY or \
+            parse_int(transaction['entry_point_selector']) in self._selectors
+
+    def slim(self, document: dict) -> dict:
+        watched = [
+            (receipt, transaction)
+            for receipt, transaction in zip(document['transaction_receipts'], document['transactions'])
+            if self(transaction)]
+
+        return {
+            **document,
+            'transactions': [transaction for _, transaction in watched],
+            'transaction_receipts': [receipt for receipt, _ in watched],
+        }
+
 
 class Crawler:
-    def __init__(self, feeder_gateway: FeederGatewayClient, async_session: sessionmaker, cooldown: float):
+    def __init__(
+            self,
+            feeder_gateway: FeederGatewayClient,
+            async_session: sessionmaker,
+            cooldown: float,
+            concurrency: int = 1,
+            batch_size: int = 1,
+            watch: Optional[Watch] = None,
+            budget: Optional[Budget] = None,
+            pending: Optional[Watch] = None,
+            archive: Optional[Archive] = None):
         self._feeder_gateway = feeder_gateway
         self._async_session = async_session
         self._block_cache = BlockCache(async_session)
+        self._contracts = {}
+        self._tip = None
         self._cooldown = cooldown
+        self._concurrency = concurrency
+        self._batch_size = batch_size
+        self._watch = watch
+        self._budget = budget
+        self._pending = pending
+        self._archive = archive
 
     async def run(self, thru):
-        block = await self._feeder_gateway.get_block(block_hash=thru)
-        i = j = block['block_number'] + 1
+        block = await self._request(Lane.TARGET, self._feeder_gateway.get_block, block_hash=thru)
+        block_number = block['block_number'] + 1
+        await self._block_cache.load()
 
-        loop = asyncio.get_running_loop()
-        cd = loop.time()
-        while True:
-            if thru is None and cd < loop.time():
-                try:
-                    await self._crawl(j)
-                    j += 1
+        lanes = [self._backfill(block_number), self._finalize()]
+        if thru is None:
+            lanes.append(self._follow(block_number))
+            if self._pending is not None:
+                lanes.append(self._poll_pending())
+        await asyncio.gather(*lanes)
+
+    async def work(self, engine: AsyncEngine, shard_size: int):
+        await self._block_cache.load()
 
+        await asyncio.gather(self._lead(engine), self._shard(engine, shard_size))
+
+    async def _lead(self, engine: AsyncEngine):
+        async with Leases(engine, HEAD_LOCK) as election:
+            while not await election.try_acquire(0):
+                await asyncio.sleep(self._cooldown)
+
+            block = await self._request(Lane.HEAD, self._feeder_gateway.get_block)
+            block_number = block['block_number'] + 1
+            async with self._async_session() as session:
+                stmt = insert(CrawlCheckpoint).values(id=HEAD, block_number=block_number)
+                block_number = (await session.execute(stmt.on_conflict_do_update(
+                    index_elements=[CrawlCheckpoint.id],
+                    set_=dict(block_number=func.greatest(CrawlCheckpoint.block_number, stmt.excluded.block_number))).
+                    returning(CrawlCheckpoint.block_number))).scalar_one()
+                await session.commit()
+            logging.warning(f'lead(block_number={block_number})')
+
+            await asyncio.gather(self._follow(block_number), self._finalize())
+
+    async def _shard(self, engine: AsyncEngine, shard_size: int):
+        backoff = Backoff(self._cooldown)
+        async with Leases(engine, SHARD_LOCK) as shards:
+            while True:
+                async with self._async_session() as session:
+                    block_number = (await session.execute(
+                        select(CrawlCheckpoint.block_number).
+                        where(CrawlCheckpoint.id == HEAD))).scalar_one_or_none()
+                if block_number is None:
+                    await backoff.sleep()
                     continue
-                except BadRequest:
-                    cd = loop.time() + self._cooldown
 
-            if i > 0:
-                await self._crawl(i - 1)
-                i -= 1
+                incomplete = [
+                    shard for shard in range((block_number - 1) // shard_size, -1, -1)
+                    if next(self._block_cache.missing(
+                        min(block_number, (shard + 1) * shard_size), shard * shard_size), None) is not None]
+                progress = False
+                for shard in incomplete:
+                    if not await shards.try_acquire(shard):
+                        continue
 
+                    try:
+                        lo, hi = shard * shard_size, min(block_number, (shard + 1) * shard_size)
+                        logging.warning(f'shard(lo={lo}, hi={hi})')
+                        await self._block_cache.refresh(lo, hi)
+                        await self._backfill(hi, lo)
+                        progress = True
+                    finally:
+                        await shards.release(shard)
+
+                if progress:
+                    backoff.reset()
+                else:
+                    await backoff.sleep()
+
+    async def _follow(self, block_number: int):
+        backoff = Backoff(self._cooldown)
+        while True:
+            head = await self._pipeline(itertools.count(block_number), Lane.HEAD, self._extend)
+            if head > block_number:
+                backoff.reset()
+            block_number = head
+            await backoff.sleep()
+
+    async def _poll_pending(self):
+        backoff = Backoff(self._cooldown)
+        while True:
+            try:
+                document = await self._request(Lane.PENDING, self._feeder_gateway.get_block, block_number='pending')
+            except BadRequest as e:
+                logging.warning(e)
+                await backoff.sleep()
                 continue
 
-            await asyncio.sleep(self._cooldown)
-
-    async def purge(self, dry=False):
-        block_number, block_number0, error = 0, -1, -1
-        while block_number0 < block_number:
-            if error is not None:
-                block_number, error = error, None
+            await self._stage(document)
+            backoff.reset()
+            await asyncio.sleep(PENDING_INTERVAL)
 
-            block_number0 = block_number
-            async with self._async_session() as session:
-                async for block in (await session.stream(
-                        select(Block).
-                        where(~Block._document['status'].astext.in_(['ACCEPTED_ON_L1', 'ACCEPTED_ONCHAIN'])).
-                        where(Block.id > block_number).
-                        order_by(Block.id).
-                        limit(20))).scalars():
-                    logging.warning(f"purge(block_hash={block.hash}, block_number={block.id})")
-                    block_number = block.id
+    async def _stage(self, document: dict):
+        transactions = [*filter(self._pending, document['transactions'])]
+        async with self._async_session() as session:
+            hashes = [transaction['transaction_hash'] for transaction in transactions]
+            persisted = set((await session.execute(
+                select(Transaction.hash).
+                where(Transaction.hash.in_(hashes)))).scalars()) if hashes else set()
+
+            await session.execute(delete(PendingTransaction))
+            rows = [
+                dict(
+                    hash=transaction['transaction_hash'],
+                    parent_block_hash=document['parent_block_hash'],
+                    type=transaction['type'],
+                    contract_address=transaction['contract_address'],
+                    entry_point_selector=transaction.get('entry_point_selector'),
+                    entry_point_type=transaction.get('entry_point_type'),
+                    calldata=[*map(parse_int, transaction[
+                        'calldata' if transaction['type'] != TYPE_DEPLOY else 'constructor_calldata'])])
+                for transaction in transactions
+                if transaction['transaction_hash'] not in persisted]
+            for chunk in chunked(rows, MAX_PARAMETERS // len(PendingTransaction.__table__.columns)):
+                await session.execute(insert(PendingTransaction).values(chunk).on_conflict_do_nothing())
+            await session.commit()
 
+        logging.warning(f'pending(parent_block_hash={document["parent_block_hash"]}, transactions={len(rows)})')
+
+    async def gaps(self):
+        await self._block_cache.load()
+        for lo, hi in reversed(await self._block_cache.gaps()):
+            await self._backfill(hi, lo)
+
+    async def _backfill(self, block_number: int, start: int = 0):
+        backoff = Backoff(self._cooldown)
+        failure = None
+        while (block_number := await self._pipeline(
+                self._block_cache.missing(block_number, start), Lane.BACKFILL)) is not None:
+            if block_number != failure:
+                backoff.reset()
+            failure = block_number
+            await backoff.sleep()
+            block_number += 1
+        await self._block_cache.checkpoint()
+
+    async def _pipeline(
+            self,
+            block_numbers: Iterable[int],
+            lane: Lane,
+            persist: Optional[Callable[[list[dict]], Awaitable[Optional[int]]]] = None) -> Optional[int]:
+        persist = persist or self._persist
+        block_numbers = iter(block_numbers)
+        window = deque()
+        try:
+            while True:
+                for n in itertools.islice(block_numbers, self._concurrency - len(window)):
+                    window.append((n, asyncio.create_task(self._fetch(n, lane))))
+                if not window:
+                    return None
+
+                documents = []
+                while window and len(documents) < self._batch_size and (not documents or window[0][1].done()):
+                    block_number, fetch = window.popleft()
                     try:
-                        document = await self._feeder_gateway.get_block(block_number=block.id)
-                    except BadRequest as e:
-                        logging.warning(e)
-                        if error is None:
-                            error = block.id
-                        continue
+                        document = await fetch
+                    except BadRequest:
+                        stop = await persist(documents)
+                        return block_number if stop is None else stop
+
+                    if document is not None:
+                        documents.append(document)
+
+                if (stop := await persist(documents)) is not None:
+                    return stop
+        finally:
+            for _, fetch in window:
+                fetch.cancel()
+            await asyncio.gather(*[fetch for _, fetch in window], return_exceptions=True)
+
+    async def _extend(self, documents: list[dict]) -> Optional[int]:
+        for i, document in enumerate(documents):
+            parent_hash = documents[i - 1]['block_hash'] if i else \
+                await self._stored_hash(document['block_number'] - 1)
+            if parent_hash is not None and parent_hash != document['parent_block_hash']:
+                await self._persist(documents[:i])
+                try:
+                    await self._rewind(document)
+                except BadRequest as e:
+                    logging.warning(e)
+                    return document['block_number']
 
-                    if document['block_hash'] != block.hash or document['status'] in ['ABORTED']:
-                        logging.warning(f"abort(block_hash={block.hash}, block_number={block.id})")
-                    if dry:
-                        continue
+                return await self._extend(documents[i:])
+
+        await self._persist(documents)
+        if documents:
+            self._tip = documents[-1]['block_number'], documents[-1]['block_hash']
+
+    async def _rewind(self, document: dict):
+        block_number, parent_hash = document['block_number'] - 1, document['parent_block_hash']
+        replacements = []
+        while block_number >= 0 and (stored_hash := await self._stored_hash(block_number)) is not None:
+            if stored_hash == parent_hash:
+                break
+
+            replacements.append(await self._request(
+                Lane.TARGET, self._feeder_gateway.get_block, block_hash=parent_hash))
+            block_number, parent_hash = block_number - 1, replacements[-1]['parent_block_hash']
 
-                    block._document = document
-                    if document['block_hash'] != block.hash or document['status'] in ['ABORTED']:
-                        await session.execute(delete(Transaction).where(Transaction.block == block))
-                        session.delete(block)
+        logging.warning(f"reorg(block_number={document['block_number']}, depth={len(replacements)})")
+        await self._persist(replacements[::-1], replace=True)
+        self._tip = document['block_number'] - 1, document['parent_block_hash']
 
+    async def _stored_hash(self, block_number: int) -> Optional[str]:
+        if self._tip is not None and self._tip[0] == block_number:
+            return self._tip[1]
+
+        async with self._async_session() as session:
+            return (await session.execute(
+                select(Block.hash).
+                where(Block.id == block_number))).scalar_one_or_none()
+
+    async def _finalize(self):
+        backoff = Backoff(self._cooldown)
+        while True:
+            if await self.purge():
+                backoff.reset()
+            await self._block_cache.checkpoint()
+            await backoff.sleep()
+
+    async def purge(self, dry=False) -> int:
+        block_number, changes = -1, 0
+        while True:
+            async with self._async_session() as session:
+                blocks = (await session.execute(
+                    select(
+                        Block.id,
+                        Block.hash,
+                        Block.status,
+                        Block.parent_hash,
+                        select(Transaction.hash).
+                        where(Transaction.block_number == Block.id).
+                        limit(1).
+                        scalar_subquery()).
+                    where(Block.status.notin_(
+                        bindparam('final_statuses', FINAL_STATUSES, expanding=True, literal_execute=True))).
+                    where(Block.id > block_number).
+                    order_by(Block.id).
+                    limit(FINALITY_BATCH_SIZE))).all()
+            if not blocks:
+                return changes
+
+            slots = asyncio.Semaphore(self._concurrency)
+            try:
+                head = await self._confirm(slots, blocks[-1][0], None)
+            except BadRequest as e:
+                logging.warning(e)
+                head = None
+            linked = chained(blocks, *head) if head is not None else 0
+            confirmations = [
+                *await asyncio.gather(
+                    *[self._confirm(slots, block_number, tx_hash)
+                      for block_number, _, _, _, tx_hash in blocks[:len(blocks) - linked]],
+                    return_exceptions=True),
+                *[(head[0] if head[0] in FINAL_STATUSES else block_status, block_hash)
+                  for _, block_hash, block_status, _, _ in blocks[len(blocks) - linked:]]]
+
+            statuses, aborted = [], []
+            for (block_number, block_hash, block_status, _, _), confirmation in zip(blocks, confirmations):
+                if isinstance(confirmation, BadRequest):
+                    logging.warning(confirmation)
+                    continue
+                if isinstance(confirmation, BaseException):
+                    raise confirmation
+
+                status, confirmed_hash = confirmation
+                if confirmed_hash != block_hash or status not in CONFIRMED_STATUSES:
+                    logging.warning(f"abort(block_hash={block_hash}, block_number={block_number})")
+                    aborted.append(block_number)
+                elif status != block_status:
+                    logging.warning(f"finalize(block_number={block_number}, status={status})")
+                    statuses.append(dict(b_id=block_number, b_status=status))
+
+            changes += len(statuses) + len(aborted)
+            if dry:
+                continue
+
+            async with self._async_session() as session:
+                if statuses:
+                    await session.execute(
+                        update(Block.__table__).
+                        where(Block.id == bindparam('b_id')).
+                        values(status=bindparam('b_status')),
+                        statuses)
+                if aborted:
+                    await uninterpreted(session, min(aborted))
+                    await session.execute(delete(Transaction).where(Transaction.block_number.in_(aborted)))
+                    await session.execute(delete(Block).where(Block.id.in_(aborted)))
+                    await self._block_cache.retreat(session, min(aborted))
                 await session.commit()
 
-    async def _crawl(self, block_number: int):
-        if await self._block_cache.hit(block_number):
-            return
+            for n in aborted:
+                self._block_cache.discard(n)
+
+    async def _confirm(self, slots: asyncio.Semaphore, block_number: int, tx_hash: Optional[str]):
+        async with slots:
+            if tx_hash is not None:
+                status = await self._request(
+                    Lane.FINALITY, self._feeder_gateway.get_transaction_status, tx_hash=tx_hash)
+
+                return status['tx_status'], status.get('block_hash')
+
+            document = await self._request(Lane.FINALITY, self._feeder_gateway.get_block, block_number=block_number)
+
+            return document['status'], document['block_hash']
+
+    async def _fetch(self, block_number: int, lane: Lane):
+        if self._block_cache.hit(block_number):
+            return None
 
         logging.warning(f'crawl_block(block_number={block_number})')
-        await self._persist(await self._feeder_gateway.get_block(block_number=block_number))
+        return await self._request(lane, self._feeder_gateway.get_block, block_number=block_number)
+
+    async def _request(self, lane: Lane, call: Callable[..., Awaitable], **kwargs):
+        if self._budget is not None:
+            await self._budget.acquire(lane)
+
+        return await call(**kwargs)
 
-    async def _persist(self, document):
+    async def load(self, paths: Iterable[str], batch_size: int = 1000):
+        for path in paths:
+            logging.warning(f'import(path={path})')
+            with open_ndjson(path, 'rt') as f:
+                for documents in chunked(map(loads, f), batch_size):
+                    await self._copy(documents)
+
+        await self._block_cache.load()
+        await self._block_cache.checkpoint()
+
+    async def dump(self, path: str, lo: int = 0, hi: Optional[int] = None):
+        criteria = [Block.id >= lo] if hi is None else [Block.id >= lo, Block.id < hi]
         async with self._async_session() as session:
-            block = Block(
-                id=document['block_number'],
-                hash=document['block_hash'],
-                timestamp=datetime.fromtimestamp(document['timestamp'], timezone.utc),
-                _document=document)
-            session.add(block)
-
-            for receipt, transaction in zip(document['transaction_receipts'], document['transactions']):
-                assert receipt['transaction_hash'] == transaction['transaction_hash']
-                try:
-                    contract, = (await session.execute(
-                        select(StarkContract).
-                        where(StarkContract.address == transaction['contract_address']))).one()
-                except NoResultFound:
-                    contract = StarkContract(address=transaction['contract_address'])
-                    session.add(contract)
-
-                tx = Transaction(
-                    hash=transaction['transaction_hash'],
-                    block=block,
-                    transaction_index=receipt['transaction_index'],
-                    type=transaction['type'],
-                    contract=contract,
-                    entry_point_selector=transaction.get('entry_point_selector'),
-                    entry_point_type=transaction.get('entry_point_type'),
-                    calldata=transaction['calldata' if transaction['type'] != 'DEPLOY' else 'constructor_calldata'])
-                session.add(tx)
+            if self._archive is None and (await session.execute(
+                    select(Block.id).where(*criteria).where(Block._archive.isnot(None)).limit(1))).first():
+                raise click.UsageError('Some blocks are archived but ARCHIVE_ROOT is not configured')
+
+            stmt = select(Block.id, Block._document, Block._archive).where(*criteria).order_by(Block.id)
+            with open_ndjson(path, 'wt') as f:
+                async for block_number, document, pointer in await session.stream(
+                        stmt.execution_options(yield_per=1000)):
+                    if document is None and pointer is not None:
+                        document = self._archive.read(block_number)
+                    if document is None:
+                        logging.warning(f'dump_missing(block_number={block_number})')
+                        continue
+                    f.write(json.dumps(document))
+                    f.write('\n')
+
+    async def archive(self, batch_size: int = 1000):
+        block_number = -1
+        while True:
+            async with self._async_session() as session:
+                blocks = (await session.execute(
+                    select(Block.id, Block._document).
+                    where(Block._document.isnot(None)).
+                    where(Block._archive.is_(None)).
+                    where(Block.status.in_(FINAL_STATUSES)).
+                    where(Block.id > block_number).
+                    order_by(Block.id).
+                    limit(batch_size))).all()
+                if not blocks:
+                    return
+
+                pointers = [
+                    dict(b_id=block_number, b_archive=self._archive.append(block_number, document))
+                    for block_number, document in blocks]
+                self._archive.sync()
+                await session.execute(
+                    update(Block.__table__).
+                    where(Block.id == bindparam('b_id')).
+                    values(_archive=bindparam('b_archive'), _document=null()),
+                    pointers)
+                await session.commit()
+
+            block_number = blocks[-1][0]
+            logging.warning(f'archive(block_number={block_number})')
+
+    async def _copy(self, documents: list[dict]):
+        if self._watch:
+            documents = [*map(self._watch.slim, documents)]
+
+        async with self._async_session() as session:
+            records = [*map(BlockRecord, documents)]
+            contracts = await self._resolve(session, records)
+            connection = (await (await session.connection()).get_raw_connection()).driver_connection
+            for model, rows in zip([Block, Transaction], tabulate(records, contracts)):
+                if not rows:
+                    continue
+
+                table, columns = model.__table__, [*rows[0]]
+                encode = [
+                    json.dumps if isinstance(table.c[column].type, JSON) else None
+                    for column in columns]
+                await session.execute(text(
+                    f'CREATE TEMPORARY TABLE "import_{table.name}" '
+                    f'(LIKE "{table.name}" INCLUDING DEFAULTS) ON COMMIT DROP'))
+                await connection.copy_records_to_table(
+                    f'import_{table.name}',
+                    columns=columns,
+                    records=[
+                        tuple(f(row[column]) if f else row[column] for column, f in zip(columns, encode))
+                        for row in rows])
+                await session.execute(text(
+                    f'INSERT INTO "{table.name}" ({", ".join(columns)}) '
+                    f'SELECT {", ".join(columns)} FROM "import_{table.name}" ON CONFLICT DO NOTHING'))
 
             await session.commit()
 
+        self._contracts.update(contracts)
+
+    async def _persist(self, documents: list[dict], replace: bool = False):
+        if not documents:
+            return
+
+        hashes = [
+            transaction['transaction_hash']
+            for document in documents
+            for transaction in document['transactions']]
+        if self._watch:
+            documents = [*map(self._watch.slim, documents)]
+
+        async with self._async_session() as session:
+            records = [*map(BlockRecord, documents)]
+            contracts = await self._resolve(session, records)
+            blocks, transactions = tabulate(records, contracts)
+
+            for chunk in chunked(hashes, MAX_PARAMETERS):
+                await session.execute(delete(PendingTransaction).where(PendingTransaction.hash.in_(chunk)))
+
+            if replace:
+                replaced = [block['id'] for block in blocks]
+                await uninterpreted(session, min(replaced))
+                await session.execute(delete(Transaction).where(Transaction.block_number.in_(replaced)))
+                await session.execute(delete(Block).where(Block.id.in_(replaced)))
+
+            for model, rows in [(Block, blocks), (Transaction, transactions)]:
+                for chunk in chunked(rows, MAX_PARAMETERS // len(model.__table__.columns)):
+                    await session.execute(insert(model).values(chunk).on_conflict_do_nothing())
 
-def build():
+            await session.commit()
+
+        self._contracts.update(contracts)
+        for document in documents:
+            self._block_cache.add(document['block_number'])
+
+    async def _resolve(self, session: AsyncSession, records: list[BlockRecord]) -> dict[str, int]:
+        addresses = {
+            transaction.contract_address
+            for record in records
+            for transaction in record.transactions}
+        contracts = {address: self._contracts[address] for address in addresses if address in self._contracts}
+        for chunk in chunked(sorted(addresses - contracts.keys()), MAX_PARAMETERS):
+            stmt = insert(StarkContract).values([dict(address=address) for address in chunk])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[StarkContract.address],
+                set_=dict(address=stmt.excluded.address))
+            for contract_id, address in await session.execute(
+                    stmt.returning(StarkContract.id, StarkContract.address)):
+                contracts[address] = contract_id
+
+        return contracts
+
+
+async def uninterpreted(session: AsyncSession, block_number: int):
+    interpreted = (await session.execute(
+        select(StarkContract.address, StarkContract.block_counter).
+        where(StarkContract.block_counter > block_number).
+        order_by(StarkContract.id).
+        limit(1).
+        with_for_update())).first()
+    if interpreted is not None:
+        address, block_counter = interpreted
+        raise click.ClickException(
+            f'Block {block_number} is being replaced but {address} has already been interpreted '
+            f'through block {block_counter - 1}; rewind the interpreter before crawling on')
+
+
+def tabulate(records: list[BlockRecord], contracts: dict[str, int]) -> tuple[list[dict], list[dict]]:
+    blocks, transactions = [], []
+    for record in records:
+        blocks.append(dict(
+            id=record.number,
+            hash=record.hash,
+            parent_hash=record.parent_hash,
+            timestamp=record.timestamp,
+            status=record.status,
+            _document=record.document))
+        transactions.extend(
+            dict(
+                hash=transaction.hash,
+                block_number=record.number,
+                transaction_index=transaction.index,
+                type=transaction.type,
+                contract_id=contracts[transaction.contract_address],
+                entry_point_selector=transaction.entry_point_selector,
+                entry_point_type=transaction.entry_point_type,
+                calldata=transaction.calldata,
+                l2_to_l1_messages=transaction.l2_to_l1_messages)
+            for transaction in record.transactions)
+
+    return blocks, transactions
+
+
+def chained(blocks: list, status: str, block_hash: str) -> int:
+    if block_hash != blocks[-1][1] or status not in CONFIRMED_STATUSES:
+        return 0
+
+    n = 1
+    while n < len(blocks) and \
+            blocks[-n - 1][0] == blocks[-n][0] - 1 and blocks[-n - 1][1] == blocks[-n][3]:
+        n += 1
+
+    return n
+
+
+def open_ndjson(path: str, mode: str):
+    if path.endswith('.zst'):
+        import zstandard
+
+        return zstandard.open(path, mode)
+
+    return open(path, mode)
+
+
+def chunked(rows: Iterable, size: int) -> Iterator[list]:
+    rows = iter(rows)
+    while chunk := [*itertools.islice(rows, size)]:
+        yield chunk
+
+
+def build(
+        concurrency: int = 1,
+        batch_size: int = 1,
+        watch: Optional[Watch] = None,
+        rate: Optional[float] = None,
+        burst: int = 1,
+        pending: bool = False):
     from richmetas.globals import async_session, feeder_gateway_client
 
-    return Crawler(feeder_gateway_client, async_session, 15)
+    return Crawler(
+        feeder_gateway_client,
+        async_session,
+        15,
+        concurrency,
+        batch_size,
+        watch,
+        Budget(rate, burst) if rate else None,
+        (watch or Watch([config('STARK_RICHMETAS_CONTRACT_ADDRESS')])) if pending else None,
+        Archive(Path(config('ARCHIVE_ROOT'))) if config('ARCHIVE_ROOT', default='') else None)
+
+
+def supervised(main: Awaitable):
+    from richmetas.globals import transport
+
+    return asyncio.run(supervise(main, transport))
 
 
 @click.group(invoke_without_command=True)
 @click.option('--thru')
+@click.option('--concurrency', default=1, type=int)
+@click.option('--batch-size', default=1, type=int)
+@click.option('--watch', multiple=True)
+@click.option('--selector', multiple=True)
+@click.option('--rate', type=float)
+@click.option('--burst', default=1, type=int)
+@click.option('--pending', is_flag=True)
 @click.pass_context
-def crawl(ctx, thru):
+def crawl(ctx, thru, concurrency, batch_size, watch, selector, rate, burst, pending):
+    if ctx.invoked_subcommand == 'bench':
+        return
+
+    ctx.obj = build(concurrency, batch_size, Watch(watch, selector) if watch else None, rate, burst, pending)
     if not ctx.invoked_subcommand:
-        asyncio.run(build().run(thru))
+        supervised(ctx.obj.run(thru))
+
+
+@crawl.command()
+@click.option('--shard-size', default=10000, type=int)
+@click.pass_obj
+def worker(crawler: Crawler, shard_size):
+    from richmetas.globals import engine
+
+    supervised(crawler.work(engine, shard_size))
+
+
+@crawl.command()
+@click.pass_obj
+def gaps(crawler: Crawler):
+    supervised(crawler.gaps())
+
+
+@crawl.command('import')
+@click.argument('paths', nargs=-1, type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', default=1000, type=int)
+@click.pass_obj
+def import_(crawler: Crawler, paths, batch_size):
+    supervised(crawler.load(paths, batch_size))
+
+
+@crawl.command()
+@click.argument('path', type=click.Path(dir_okay=False))
+@click.option('--from', 'lo', default=0, type=int)
+@click.option('--to', 'hi', type=int)
+@click.pass_obj
+def dump(crawler: Crawler, path, lo, hi):
+    supervised(crawler.dump(path, lo, hi))
+
+
+@crawl.command()
+@click.option('--batch-size', default=1000, type=int)
+@click.pass_obj
+def archive(crawler: Crawler, batch_size):
+    if not config('ARCHIVE_ROOT', default=''):
+        raise click.UsageError('ARCHIVE_ROOT is not configured')
+
+    supervised(crawler.archive(batch_size))
+
+
+@crawl.command()
+@click.option('--database-url', required=True)
+@click.option('--blocks', default=1000, type=int)
+@click.option('--transactions', default=50, type=int)
+@click.option('--calldata', default=8, type=int)
+@click.option('--latency', default=0.05, type=float)
+@click.option('--recorded', type=click.Path(exists=True, dir_okay=False))
+@click.pass_context
+def bench(ctx, database_url, blocks, transactions, calldata, latency, recorded):
+    from sqlalchemy.engine import make_url
+
+    from richmetas import bench as bench_
+
+    if config('DATABASE_URL', default='') and \
+            make_url(config('DATABASE_URL')).set(drivername='postgresql') == \
+            make_url(database_url).set(drivername='postgresql'):
+        raise click.UsageError('--database-url must not be the configured DATABASE_URL; bench truncates its tables')
+
+    documents = bench_.load_documents(recorded) if recorded else \
+        [bench_.synthesize(n, transactions, calldata) for n in range(blocks)]
+    params = ctx.parent.params
+    report = asyncio.run(bench_.bench(
+        database_url,
+        documents,
+        latency,
+        params['concurrency'],
+        params['batch_size'],
+        params['rate'],
+        params['burst']))
+    for key, value in report.items():
+        click.echo(f'{key}: {value:.3f}' if isinstance(value, float) else f'{key}: {value}')
 
 
 @crawl.command()
 @click.option('--dry', is_flag=True)
-def purge(dry):
-    asyncio.run(build().purge(dry))
+@click.pass_obj
+def purge(crawler: Crawler, dry):
+    supervised(crawler.purge(dry))
@@ -12,7 +12,9 @@ from sqlalchemy.orm import sessionmaker
 from starkware.starknet.services.api.feeder_gateway.feeder_gateway_client import FeederGatewayClient
 from web3 import Web3
 
+from richmetas.contracts.entry_points import WITHDRAW, WITHDRAW_MESSAGE
 from richmetas.models import EthBlock, EthEvent, TokenContract, Withdrawal, TokenFlow, FlowType
+from richmetas.transport import supervise
 from richmetas.utils import parse_int, to_checksum_address
 
 
@@ -94,8 +96,9 @@ class Monitor:
                 session.add(ee)
 
                 payload, = decode_abi(['uint256[]'], decode_hex(e.data))
-                if payload[0] == 0:
-                    _withdraw, address, amount_or_token_id, contract, org, nonce = payload
+                message = WITHDRAW_MESSAGE.decode(payload)
+                if message.kind == WITHDRAW:
+                    _withdraw, address, amount_or_token_id, contract, org, nonce = message
                     token_contract = (await session.execute(
                         select(TokenContract).
                         where(TokenContract.address == to_checksum_address(contract)))).scalar_one()
@@ -134,7 +137,7 @@ def cast(x):
 def cli():
     from decouple import config
     from web3.middleware import geth_poa_middleware
-    from richmetas.globals import async_session, feeder_gateway_client
+    from richmetas.globals import async_session, feeder_gateway_client, transport
 
     w3 = Web3()
     w3.middleware_onion.inject(geth_poa_middleware, layer=0)
@@ -145,4 +148,4 @@ def cli():
         config('STARK_RICHMETAS_CONTRACT_ADDRESS'),
         config('ETHER_RICHMETAS_CONTRACT_ADDRESS'),
     )
-    asyncio.run(m.run())
+    asyncio.run(supervise(m.run(), transport))
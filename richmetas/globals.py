@@ -1,18 +1,32 @@
 import logging
+from pathlib import Path
 
 from decouple import config
 from services.external_api.base_client import RetryConfig
 from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
-from starkware.starknet.services.api.feeder_gateway.feeder_gateway_client import FeederGatewayClient
-from starkware.starknet.services.api.gateway.gateway_client import GatewayClient
+
+from richmetas.cache import DiskCache
+from richmetas.transport import PooledFeederGatewayClient, PooledGatewayClient, Transport
 
 logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-feeder_gateway_client = FeederGatewayClient(
+transport = Transport(
+    limit=config('HTTP_POOL_LIMIT', default=100, cast=int),
+    limit_per_host=config('HTTP_POOL_LIMIT_PER_HOST', default=0, cast=int),
+    keepalive_timeout=config('HTTP_POOL_KEEPALIVE_TIMEOUT', default=15, cast=float),
+    timeout=config('HTTP_POOL_TIMEOUT', default=60, cast=float))
+feeder_cache = DiskCache(
+    Path(config('FEEDER_CACHE_ROOT')),
+    config('FEEDER_CACHE_TTL', default=10, cast=float),
+    config('FEEDER_CACHE_MAX_SIZE', default=1 << 30, cast=int)) if config('FEEDER_CACHE_ROOT', default='') else None
+feeder_gateway_client = PooledFeederGatewayClient(
+    transport,
+    feeder_cache,
     url=config('FEEDER_GATEWAY_URL'),
     retry_config=RetryConfig(n_retries=1))
-gateway_client = GatewayClient(
+gateway_client = PooledGatewayClient(
+    transport,
     url=config('GATEWAY_URL'),
     retry_config=RetryConfig(n_retries=1))
 engine = create_async_engine(
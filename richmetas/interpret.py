@@ -1,68 +1,152 @@
 import asyncio
 import logging
+import time
 from decimal import Decimal
 from typing import Optional
 from urllib.parse import urljoin
 
-import aiohttp
 import click
-from decouple import config
-from sqlalchemy import select
+from sqlalchemy import func, select, tuple_
 from sqlalchemy.exc import NoResultFound
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from web3 import Web3
 
-from richmetas.contracts import ERC20, ERC721Metadata, StarkRichmetas
+from richmetas.cache import LRUCache
+from richmetas.contracts import ERC20, ERC721Metadata
+from richmetas.contracts.entry_points import WITHDRAW_MESSAGE, lookup
 from richmetas.models import Account, TokenContract, Token, LimitOrder, Block, StarkContract, Blueprint, Transfer, \
-    TokenFlow, FlowType, Withdrawal, Deposit
+    TokenFlow, FlowType, Withdrawal, Deposit, CrawlCheckpoint, MetadataRequest
+from richmetas.models.CrawlCheckpoint import CONTIGUOUS
 from richmetas.models.LimitOrder import Side
 from richmetas.models.TokenContract import KIND_ERC721
 from richmetas.models.Transaction import Transaction, TYPE_DEPLOY
-from richmetas.globals import async_session, feeder_gateway_client, gateway_client
+from richmetas.globals import async_session, transport
 from richmetas.services import TransferService
-from richmetas.utils import to_checksum_address, parse_int, ZERO_ADDRESS, Status
+from richmetas.transport import supervise
+from richmetas.utils import to_checksum_address, parse_int, ZERO_ADDRESS
+
+INSTRUCTIONS = {
+    'register_contract',
+    'register_client',
+    'mint',
+    'withdraw',
+    'deposit',
+    'transfer',
+    'create_order',
+    'fulfill_order',
+    'cancel_order',
+}
+ACCOUNT_FIELDS = ('user', 'mint', 'from_', 'to_')
+CONTRACT_FIELDS = ('contract', 'base_contract', 'quote_contract')
+TOKEN_FIELDS = (('token_id', 'contract'), ('amount_or_token_id', 'contract'), ('base_token_id', 'base_contract'))
 
 
 class RichmetasInterpreter:
-    def __init__(self, session: AsyncSession, client: aiohttp.ClientSession, w3: Web3):
+    def __init__(self, session: AsyncSession, w3: Web3, cache: Optional[LRUCache] = None):
         self.session = session
-        self.client = client
         self.w3 = w3
-        self._transfer_service = TransferService(self.session)
+        self._cache = cache
+        self._transfer_service = TransferService(self.session, cache)
+        self._contracts: dict[str, Optional[TokenContract]] = {}
+        self._tokens: dict[tuple[str, Decimal], Optional[Token]] = {}
+        self._token_uris: dict[tuple[str, Decimal], str] = {}
+        self._orders: dict[Decimal, Optional[LimitOrder]] = {}
+        self._transfers: dict[str, Optional[Transfer]] = {}
+
+    async def prefetch(self, txs: list[Transaction]):
+        stark_keys, addresses, token_keys, order_ids, hashes = set(), set(), set(), set(), set()
+        for tx in txs:
+            entry_point = lookup(tx.entry_point_selector)
+            if entry_point is None or entry_point.name not in INSTRUCTIONS:
+                continue
+
+            call = entry_point.decode(tx.calldata)._asdict()
+            stark_keys.update(Decimal(call[field]) for field in ACCOUNT_FIELDS if field in call)
+            addresses.update(to_checksum_address(call[field]) for field in CONTRACT_FIELDS if field in call)
+            token_keys.update(
+                (to_checksum_address(call[contract]), Decimal(call[token_id]))
+                for token_id, contract in TOKEN_FIELDS if token_id in call)
+            if 'id' in call:
+                order_ids.add(Decimal(call['id']))
+            if entry_point.name == 'transfer':
+                hashes.add(tx.hash)
+
+        if order_ids := order_ids - self._orders.keys():
+            self._orders.update(dict.fromkeys(order_ids))
+            for limit_order in (await self.session.execute(
+                    select(LimitOrder).
+                    where(LimitOrder.order_id.in_(order_ids)).
+                    options(selectinload(LimitOrder.token).selectinload(Token.owner),
+                            selectinload(LimitOrder.user),
+                            selectinload(LimitOrder.quote_contract)))).scalars():
+                self._orders[limit_order.order_id] = limit_order
+                stark_keys.add(limit_order.user.stark_key)
+                addresses.add(limit_order.quote_contract.address)
+
+        addresses -= self._contracts.keys()
+        for address in [*addresses]:
+            if (token_contract := await self._recall(('contract', address))) is not None:
+                self._contracts[address] = token_contract
+                addresses.remove(address)
+        if addresses:
+            self._contracts.update(dict.fromkeys(addresses))
+            for token_contract in (await self.session.execute(
+                    select(TokenContract).
+                    where(TokenContract.address.in_(addresses)).
+                    options(selectinload(TokenContract.blueprint).
+                            selectinload(Blueprint.minter)))).scalars():
+                self._contracts[token_contract.address] = token_contract
+
+        await self._transfer_service.prefetch(
+            stark_keys, [token_contract for token_contract in self._contracts.values() if token_contract is not None])
+
+        token_keys = {
+            (address, token_id) for address, token_id in token_keys - self._tokens.keys()
+            if self._contracts.get(address) is not None and not self._contracts[address].fungible}
+        missing = set()
+        for key in token_keys:
+            if (token := await self._recall(('token', *key))) is not None:
+                self._tokens[key] = token
+            else:
+                missing.add(key)
+        if missing:
+            self._tokens.update(dict.fromkeys(missing))
+            for token in (await self.session.execute(
+                    select(Token).
+                    where(tuple_(Token.contract_id, Token.token_id).in_(
+                        [(self._contracts[address].id, token_id) for address, token_id in missing])).
+                    options(selectinload(Token.contract), selectinload(Token.owner)))).scalars():
+                self._tokens[(token.contract.address, token.token_id)] = token
+
+        if hashes := hashes - self._transfers.keys():
+            self._transfers.update(dict.fromkeys(hashes))
+            for transfer in (await self.session.execute(
+                    select(Transfer).where(Transfer.hash.in_(hashes)))).scalars():
+                self._transfers[transfer.hash] = transfer
+
+        token_keys = [
+            key for key in token_keys
+            if not self._contracts[key[0]].base_uri and not getattr(self._tokens[key], 'token_uri', None)]
+        for key, token_uri in zip(token_keys, await asyncio.gather(
+                *[asyncio.to_thread(ERC721Metadata(address, self.w3).token_uri, int(token_id))
+                  for address, token_id in token_keys],
+                return_exceptions=True)):
+            if isinstance(token_uri, str):
+                self._token_uris[key] = token_uri
 
     async def exec(self, tx: Transaction):
-        from starkware.starknet.public.abi import get_selector_from_name
-
-        instructions = dict([
-            ('0x%x' % get_selector_from_name(f), self.__getattribute__(f))
-            for f in [
-                'register_contract',
-                'register_client',
-                'mint',
-                'withdraw',
-                'deposit',
-                'transfer',
-                'create_order',
-                'fulfill_order',
-                'cancel_order',
-            ]
-        ])
-        try:
-            await instructions[tx.entry_point_selector](tx)
-        except KeyError:
-            pass
+        entry_point = lookup(tx.entry_point_selector)
+        if entry_point is None or entry_point.name not in INSTRUCTIONS:
+            return
+
+        await self.__getattribute__(entry_point.name)(tx, entry_point.decode(tx.calldata))
 
-    async def register_contract(self, tx: Transaction):
+    async def register_contract(self, tx: Transaction, call):
         logging.warning(f'register_contract')
-        _from_address, contract, kind, mint = tx.params
-        address = to_checksum_address(contract)
+        _from_address, contract, kind, mint = call
         try:
-            token_contract = (await self.session.execute(
-                select(TokenContract).
-                where(TokenContract.address == address).
-                options(selectinload(TokenContract.blueprint).
-                        selectinload(Blueprint.minter)))).scalar_one()
+            token_contract = await self.get_contract(contract)
             assert token_contract.fungible == (int(kind) != KIND_ERC721)
             if not token_contract.fungible:
                 assert token_contract.blueprint.minter.stark_key == Decimal(mint)
@@ -79,15 +163,16 @@ class RichmetasInterpreter:
                 fungible=fungible,
                 blueprint=blueprint)
             self.session.add(self.lift_contract(token_contract))
+            self._contracts[token_contract.address] = token_contract
 
-    async def register_client(self, tx: Transaction):
+    async def register_client(self, tx: Transaction, call):
         logging.warning(f'register_client')
-        user, address, _nonce = tx.params
+        user, address, _nonce = call
         await self.lift_account(user, address)
 
-    async def mint(self, tx: Transaction):
+    async def mint(self, tx: Transaction, call):
         logging.warning(f'mint')
-        user, token_id, contract, _nonce = tx.params
+        user, token_id, contract, _nonce = call
         token = await self.lift_token(token_id, contract)
         token.latest_tx = tx
 
@@ -100,17 +185,13 @@ class RichmetasInterpreter:
         )
         self.session.add(flow)
 
-    async def withdraw(self, tx: Transaction):
+    async def withdraw(self, tx: Transaction, call):
         logging.warning(f'withdraw')
-        user, amount_or_token_id, contract, address, nonce = tx.params
+        user, amount_or_token_id, contract, address, nonce = call
         account = await self._transfer_service.lift_account(parse_int(user))
         token = await self.lift_token(amount_or_token_id, contract)
         if token:
             assert token.owner == account
-            for receipt in tx.block._document['transaction_receipts']:
-                if receipt['transaction_hash'] == tx.hash:
-                    break
-
             flow = TokenFlow(
                 transaction=tx,
                 type=FlowType.WITHDRAWAL.value,
@@ -118,16 +199,14 @@ class RichmetasInterpreter:
                 from_account=token.owner,
                 address=to_checksum_address(address),
                 nonce=parse_int(nonce),
-                mint=receipt['l2_to_l1_messages'][0]['payload'][4] == '1',
+                mint=WITHDRAW_MESSAGE.decode(tx.l2_to_l1_messages[0]['payload']).origin == 1,
             )
             self.session.add(flow)
 
             token.owner = None
             token.latest_tx = tx
         else:
-            token_contract = (await self.session.execute(
-                select(TokenContract).
-                where(TokenContract.address == to_checksum_address(contract)))).scalar_one()
+            token_contract = await self.get_contract(contract)
             balance = await self._transfer_service.lift_balance(account, token_contract)
             withdrawal = Withdrawal(
                 transaction=tx,
@@ -139,9 +218,9 @@ class RichmetasInterpreter:
             self.session.add(withdrawal)
             balance.amount -= withdrawal.amount
 
-    async def deposit(self, tx: Transaction):
+    async def deposit(self, tx: Transaction, call):
         logging.warning(f'deposit')
-        _from_address, user, amount_or_token_id, contract, _nonce = tx.params
+        _from_address, user, amount_or_token_id, contract, _nonce = call
         account = await self.lift_account(user)
         token = await self.lift_token(amount_or_token_id, contract)
         if token:
@@ -156,9 +235,7 @@ class RichmetasInterpreter:
             )
             self.session.add(flow)
         else:
-            token_contract = (await self.session.execute(
-                select(TokenContract).
-                where(TokenContract.address == to_checksum_address(contract)))).scalar_one()
+            token_contract = await self.get_contract(contract)
             balance = await self._transfer_service.lift_balance(account, token_contract)
             deposit = Deposit(
                 transaction=tx,
@@ -168,9 +245,9 @@ class RichmetasInterpreter:
             self.session.add(deposit)
             balance.amount += deposit.amount
 
-    async def transfer(self, tx: Transaction):
+    async def transfer(self, tx: Transaction, call):
         logging.warning(f'transfer')
-        from_address, to_address, amount_or_token_id, contract, nonce = tx.params
+        from_address, to_address, amount_or_token_id, contract, nonce = call
         token = await self.lift_token(amount_or_token_id, contract)
         if token:
             from_account = await self.lift_account(from_address)
@@ -189,16 +266,15 @@ class RichmetasInterpreter:
             )
             self.session.add(flow)
         else:
-            status = tx.block._document['status']
-            try:
-                transfer = (await self.session.execute(
-                    select(Transfer).where(Transfer.hash == tx.hash))).scalar_one()
-                transfer.status = status
-            except NoResultFound:
-                token_contract = (await self.session.execute(
-                    select(TokenContract).
-                    where(TokenContract.address == to_checksum_address(contract)))).scalar_one()
-                await TransferService(self.session).transfer(
+            status = tx.block.status
+            if tx.hash not in self._transfers:
+                self._transfers[tx.hash] = (await self.session.execute(
+                    select(Transfer).where(Transfer.hash == tx.hash))).scalar_one_or_none()
+            if self._transfers[tx.hash] is not None:
+                self._transfers[tx.hash].status = status
+            else:
+                token_contract = await self.get_contract(contract)
+                await self._transfer_service.transfer(
                     tx.hash,
                     parse_int(from_address),
                     parse_int(to_address),
@@ -207,13 +283,12 @@ class RichmetasInterpreter:
                     parse_int(nonce),
                     status=status)
 
-    async def create_order(self, tx: Transaction):
+    async def create_order(self, tx: Transaction, call):
         logging.warning(f'create_order')
-        order_id, user, bid, base_contract, base_token_id, quote_contract, quote_amount = tx.params
+        order_id, user, bid, base_contract, base_token_id, quote_contract, quote_amount = call
         account = await self.lift_account(user)
         token = await self.lift_token(base_token_id, base_contract)
-        quote_contract, = (await self.session.execute(
-            select(TokenContract).where(TokenContract.address == to_checksum_address(quote_contract)))).one()
+        quote_contract = await self.get_contract(quote_contract)
 
         limit_order = LimitOrder(
             order_id=Decimal(order_id),
@@ -224,6 +299,7 @@ class RichmetasInterpreter:
             quote_amount=Decimal(quote_amount),
             tx=tx)
         self.session.add(limit_order)
+        self._orders[limit_order.order_id] = limit_order
 
         if not limit_order.bid:
             assert token.owner == account
@@ -232,15 +308,10 @@ class RichmetasInterpreter:
             balance = await self._transfer_service.lift_balance(account, quote_contract)
             balance.amount -= limit_order.quote_amount
 
-    async def fulfill_order(self, tx: Transaction):
+    async def fulfill_order(self, tx: Transaction, call):
         logging.warning(f'fulfill_order')
-        order_id, user, _nonce = tx.params
-        limit_order, = (await self.session.execute(
-            select(LimitOrder).
-            where(LimitOrder.order_id == Decimal(order_id)).
-            options(selectinload(LimitOrder.token),
-                    selectinload(LimitOrder.user),
-                    selectinload(LimitOrder.quote_contract)))).one()
+        order_id, user, _nonce = call
+        limit_order = await self.get_order(order_id)
         limit_order.closed_tx = tx
         limit_order.fulfilled = True
 
@@ -261,13 +332,10 @@ class RichmetasInterpreter:
             balance = await self._transfer_service.lift_balance(limit_order.user, limit_order.quote_contract)
             balance.amount += limit_order.quote_amount
 
-    async def cancel_order(self, tx: Transaction):
+    async def cancel_order(self, tx: Transaction, call):
         logging.warning(f'cancel_order')
-        order_id, nonce_ = tx.params
-        limit_order, = (await self.session.execute(
-            select(LimitOrder).
-            where(LimitOrder.order_id == Decimal(order_id)).
-            options(selectinload(LimitOrder.token)))).one()
+        order_id, nonce_ = call
+        limit_order = await self.get_order(order_id)
         limit_order.closed_tx = tx
         limit_order.fulfilled = False
 
@@ -277,17 +345,35 @@ class RichmetasInterpreter:
         else:
             limit_order.token.ask = None
 
-    async def lift_account(self, user: str, address: Optional[str] = None) -> Account:
-        user = Decimal(user)
-
-        try:
-            account, = (await self.session.execute(
-                select(Account).
-                where(Account.stark_key == user))).one()
-        except NoResultFound:
-            account = Account(stark_key=user)
-            self.session.add(account)
+    async def get_contract(self, address: str) -> TokenContract:
+        address = to_checksum_address(address)
+        if address not in self._contracts:
+            self._contracts[address] = await self._recall(('contract', address)) or (await self.session.execute(
+                select(TokenContract).
+                where(TokenContract.address == address).
+                options(selectinload(TokenContract.blueprint).
+                        selectinload(Blueprint.minter)))).scalar_one_or_none()
+        if self._contracts[address] is None:
+            raise NoResultFound(f'No token contract at {address}')
+
+        return self._contracts[address]
+
+    async def get_order(self, order_id: str) -> LimitOrder:
+        order_id = Decimal(order_id)
+        if order_id not in self._orders:
+            self._orders[order_id] = (await self.session.execute(
+                select(LimitOrder).
+                where(LimitOrder.order_id == order_id).
+                options(selectinload(LimitOrder.token).selectinload(Token.owner),
+                        selectinload(LimitOrder.user),
+                        selectinload(LimitOrder.quote_contract)))).scalar_one_or_none()
+        if self._orders[order_id] is None:
+            raise NoResultFound(f'No limit order {order_id}')
+
+        return self._orders[order_id]
 
+    async def lift_account(self, user: str, address: Optional[str] = None) -> Account:
+        account = await self._transfer_service.lift_account(parse_int(user))
         if address:
             account.address = to_checksum_address(address)
 
@@ -295,35 +381,59 @@ class RichmetasInterpreter:
 
     async def lift_token(self, token_id: str, contract: str) -> Optional[Token]:
         token_id = Decimal(token_id)
-        contract = to_checksum_address(contract)
-
-        token_contract, = (await self.session.execute(
-            select(TokenContract).where(TokenContract.address == contract))).one()
+        token_contract = await self.get_contract(contract)
         if token_contract.fungible:
             return None
 
-        try:
-            token, = (await self.session.execute(
+        key = token_contract.address, token_id
+        if key not in self._tokens:
+            self._tokens[key] = await self._recall(('token', *key)) or (await self.session.execute(
                 select(Token).
                 where(Token.token_id == token_id).
                 where(Token.contract == token_contract).
-                options(selectinload(Token.owner)))).one()
-        except NoResultFound:
+                options(selectinload(Token.owner)))).scalar_one_or_none()
+        if (token := self._tokens[key]) is None:
             token = Token(contract=token_contract, token_id=token_id, nonce=0)
             self.session.add(token)
+            self._tokens[key] = token
 
-        token.token_uri = urljoin(token_contract.base_uri, str(token_id)) if token_contract.base_uri else \
+        token_uri = urljoin(token_contract.base_uri, str(token_id)) if token_contract.base_uri else \
+            token.token_uri or self._token_uris.get(key) or \
             ERC721Metadata(token_contract.address, self.w3).token_uri(int(token_id))
-        async with self.client.get(token.token_uri) as resp:
-            token.asset_metadata = await resp.json()
-
-            ERC721Metadata.validate(token.asset_metadata)
-            token.name = token.asset_metadata['name']
-            token.description = token.asset_metadata['description']
-            token.image = token.asset_metadata['image']
+        if token_uri != token.token_uri:
+            token.token_uri = token_uri
+            if token.id is None:
+                token.metadata_request = MetadataRequest(token_uri=token_uri)
+            elif (metadata_request := (await self.session.execute(
+                    select(MetadataRequest).
+                    where(MetadataRequest.token_id == token.id))).scalar_one_or_none()) is None:
+                self.session.add(MetadataRequest(token_id=token.id, token_uri=token_uri))
+            else:
+                metadata_request.token_uri = token_uri
+                metadata_request.attempts = 0
+                metadata_request.not_before = func.now()
 
         return token
 
+    def retain(self):
+        if self._cache is None:
+            return
+
+        for address, token_contract in self._contracts.items():
+            if token_contract is not None:
+                self._cache.put(('contract', address), token_contract)
+        for key, token in self._tokens.items():
+            if token is not None:
+                self.session.expire(token, ['latest_tx', 'ask', 'metadata_request'])
+                self._cache.put(('token', *key), token)
+        self._transfer_service.retain()
+
+    async def _recall(self, key: tuple):
+        if self._cache is None or (instance := self._cache.get(key)) is None:
+            return None
+
+        return await self.session.merge(instance, load=False)
+
     def lift_contract(self, token_contract: TokenContract) -> TokenContract:
         if token_contract.address == ZERO_ADDRESS:
             token_contract.name, token_contract.symbol, token_contract.decimals = 'Ether', 'ETH', 18
@@ -341,11 +451,43 @@ class RichmetasInterpreter:
         return token_contract
 
 
-async def interpret(address: str):
-    richmetas = StarkRichmetas(
-        config('STARK_RICHMETAS_CONTRACT_ADDRESS', cast=parse_int),
-        feeder_gateway_client,
-        gateway_client)
+async def catch_up(
+        session: AsyncSession,
+        interpreter: RichmetasInterpreter,
+        contract: StarkContract,
+        stop: int,
+        batch_ms: int):
+    logging.warning(f'catch_up(block_number={contract.block_counter}, stop={stop})')
+    txs = (await session.execute(
+        select(Transaction).
+        where(Transaction.contract == contract).
+        where(Transaction.block_number >= contract.block_counter).
+        where(Transaction.block_number < stop).
+        order_by(Transaction.block_number, Transaction.transaction_index).
+        options(selectinload(Transaction.block)))).scalars().all()
+    await interpreter.prefetch(txs)
+
+    deadline = time.monotonic() + batch_ms / 1000
+    for tx in txs:
+        if tx.block_number > contract.block_counter and time.monotonic() > deadline:
+            contract.block_counter = tx.block_number
+            await session.commit()
+            deadline = time.monotonic() + batch_ms / 1000
+
+        logging.warning(f'interpret(tx={tx.hash})')
+        await interpreter.exec(tx)
+
+    contract.block_counter = stop
+
+
+async def interpret(
+        address: str,
+        batch_blocks: int = 1000,
+        batch_ms: int = 1000,
+        lag: int = 10,
+        cache_size: int = 100000,
+        cache_ttl: float = 60):
+    cache = LRUCache(cache_size, cache_ttl) if cache_size else None
 
     async with async_session() as session:
         try:
@@ -384,6 +526,21 @@ async def interpret(address: str):
                     await asyncio.sleep(15)
                     continue
 
+            watermark = (await session.execute(
+                select(CrawlCheckpoint.block_number).
+                where(CrawlCheckpoint.id == CONTIGUOUS))).scalar_one_or_none()
+            if watermark is not None and watermark - contract.block_counter > lag:
+                interpreter = RichmetasInterpreter(session, Web3(), cache)
+                await catch_up(
+                    session,
+                    interpreter,
+                    contract,
+                    min(watermark + 1, contract.block_counter + batch_blocks),
+                    batch_ms)
+                await session.commit()
+                interpreter.retain()
+                continue
+
             try:
                 block, = (await session.execute(
                     select(Block).where(Block.id == contract.block_counter))).one()
@@ -392,46 +549,29 @@ async def interpret(address: str):
                 await asyncio.sleep(15)
                 continue
 
-            async with aiohttp.ClientSession() as client:
-                interpreter = RichmetasInterpreter(session, client, Web3())
-                for tx, in await session.execute(
-                        select(Transaction).
-                        where(Transaction.block == block).
-                        where(Transaction.contract == contract).
-                        order_by(Transaction.transaction_index)):
-                    logging.warning(f'interpret(tx={tx.hash})')
-                    await interpreter.exec(tx)
+            txs = (await session.execute(
+                select(Transaction).
+                where(Transaction.block == block).
+                where(Transaction.contract == contract).
+                order_by(Transaction.transaction_index).
+                options(selectinload(Transaction.block)))).scalars().all()
+            interpreter = RichmetasInterpreter(session, Web3(), cache)
+            await interpreter.prefetch(txs)
+            for tx in txs:
+                logging.warning(f'interpret(tx={tx.hash})')
+                await interpreter.exec(tx)
 
             contract.block_counter += 1
-            for transfer in (await session.execute(
-                    select(Transfer).
-                    where(Transfer.status.in_([Status.NOT_RECEIVED.value, Status.RECEIVED.value])).
-                    limit(20).
-                    options(
-                        selectinload(Transfer.from_account),
-                        selectinload(Transfer.to_account),
-                        selectinload(Transfer.contract)))).scalars():
-                status = (await feeder_gateway_client.get_transaction_status(tx_hash=transfer.hash))['tx_status']
-                if status == Status.NOT_RECEIVED.value:
-                    logging.warning(f'transfer(hash={transfer.hash})')
-                    await richmetas.transfer(
-                        int(transfer.from_account.stark_key),
-                        int(transfer.to_account.stark_key),
-                        int(transfer.amount),
-                        transfer.contract.address,
-                        int(transfer.nonce),
-                        [int(transfer.signature_r), int(transfer.signature_s)])
-                elif status == Status.REJECTED.value:
-                    logging.warning(f'reject(hash={transfer.hash})')
-                    await TransferService(session).reject(transfer)
-                else:
-                    logging.warning(f'update(hash={transfer.hash}, status={status})')
-                    transfer.status = status
-
             await session.commit()
+            interpreter.retain()
 
 
 @click.command()
 @click.argument('contract')
-def cli(contract: str):
-    asyncio.run(interpret(contract))
+@click.option('--batch-blocks', default=1000, type=int)
+@click.option('--batch-ms', default=1000, type=int)
+@click.option('--lag', default=10, type=int)
+@click.option('--cache-size', default=100000, type=int)
+@click.option('--cache-ttl', default=60, type=float)
+def cli(contract: str, batch_blocks: int, batch_ms: int, lag: int, cache_size: int, cache_ttl: float):
+    asyncio.run(supervise(interpret(contract, batch_blocks, batch_ms, lag, cache_size, cache_ttl), transport))
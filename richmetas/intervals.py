@@ -0,0 +1,53 @@
+from bisect import bisect_right
+from collections.abc import Iterator
+
+
+class IntervalSet:
+    def __init__(self):
+        self._lo = []
+        self._hi = []
+
+    def __contains__(self, n: int) -> bool:
+        i = bisect_right(self._lo, n) - 1
+
+        return i >= 0 and n < self._hi[i]
+
+    def __iter__(self) -> Iterator[tuple[int, int]]:
+        return zip(self._lo, self._hi)
+
+    def __len__(self):
+        return sum(hi - lo for lo, hi in self)
+
+    def add(self, n: int):
+        self.add_range(n, n + 1)
+
+    def add_range(self, lo: int, hi: int):
+        if lo >= hi:
+            return
+
+        i = bisect_right(self._hi, lo - 1)
+        j = bisect_right(self._lo, hi)
+        if i < j:
+            lo = min(lo, self._lo[i])
+            hi = max(hi, self._hi[j - 1])
+        self._lo[i:j] = [lo]
+        self._hi[i:j] = [hi]
+
+    def discard(self, n: int):
+        i = bisect_right(self._lo, n) - 1
+        if i < 0 or n >= self._hi[i]:
+            return
+
+        pieces = [(lo, hi) for lo, hi in [(self._lo[i], n), (n + 1, self._hi[i])] if lo < hi]
+        self._lo[i:i + 1] = [lo for lo, _ in pieces]
+        self._hi[i:i + 1] = [hi for _, hi in pieces]
+
+    def missing(self, stop: int, start: int = 0) -> Iterator[int]:
+        n = stop - 1
+        while n >= start:
+            i = bisect_right(self._lo, n) - 1
+            if i >= 0 and n < self._hi[i]:
+                n = self._lo[i] - 1
+            else:
+                yield n
+                n -= 1
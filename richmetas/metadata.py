@@ -0,0 +1,260 @@
+import asyncio
+import hashlib
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from http import HTTPStatus
+from typing import Optional
+
+import click
+from services.external_api.base_client import BadRequest
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from richmetas.contracts import ERC721Metadata
+from richmetas.models import MetadataDocument, MetadataRequest, Token
+from richmetas.records import loads
+from richmetas.transport import Transport, supervise
+
+IDLE = 5
+MAX_BACKOFF = 3600
+
+
+class Fetched:
+    __slots__ = ('content', 'digest', 'etag', 'last_modified')
+
+    def __init__(self, content: dict, digest: str, etag: Optional[str], last_modified: Optional[str]):
+        self.content = content
+        self.digest = digest
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+class MetadataWorker:
+    def __init__(
+            self,
+            async_session: sessionmaker,
+            concurrency: int = 16,
+            limit_per_host: int = 4,
+            timeout: float = 10,
+            retries: int = 5,
+            ttl: float = 86400,
+            batch_size: int = 100,
+            lease: float = 60):
+        self._async_session = async_session
+        self._transport = Transport(limit=concurrency, limit_per_host=limit_per_host, timeout=timeout)
+        self._retries = retries
+        self._ttl = timedelta(seconds=ttl)
+        self._batch_size = batch_size
+        self._lease = timedelta(seconds=lease)
+
+    async def run(self):
+        await supervise(self._work(), self._transport)
+
+    async def _work(self):
+        while True:
+            requests = await self._claim()
+            documents = await self._claim_expired()
+            if not requests and not documents:
+                await asyncio.sleep(IDLE)
+                continue
+
+            await asyncio.gather(self._resolve(requests), self._revalidate(documents))
+
+    async def _claim(self) -> list:
+        async with self._async_session() as session:
+            requests = (await session.execute(
+                select(
+                    MetadataRequest.id,
+                    MetadataRequest.token_id,
+                    MetadataRequest.token_uri,
+                    MetadataRequest.attempts).
+                where(MetadataRequest.not_before <= func.now()).
+                where(MetadataRequest.attempts < self._retries).
+                order_by(MetadataRequest.not_before).
+                limit(self._batch_size).
+                with_for_update(skip_locked=True))).all()
+            if requests:
+                await session.execute(
+                    update(MetadataRequest).
+                    where(MetadataRequest.id.in_([request_id for request_id, _, _, _ in requests])).
+                    values(not_before=func.now() + self._lease))
+            await session.commit()
+
+        return requests
+
+    async def _claim_expired(self) -> list[MetadataDocument]:
+        async with self._async_session() as session:
+            documents = (await session.execute(
+                select(MetadataDocument).
+                where(MetadataDocument.expires_at <= func.now()).
+                order_by(MetadataDocument.expires_at).
+                limit(self._batch_size).
+                with_for_update(skip_locked=True))).scalars().all()
+            if documents:
+                await session.execute(
+                    update(MetadataDocument).
+                    where(MetadataDocument.id.in_([document.id for document in documents])).
+                    values(expires_at=func.now() + self._lease))
+            await session.commit()
+
+        return documents
+
+    async def _resolve(self, requests: list):
+        if not requests:
+            return
+
+        pending = defaultdict(list)
+        for request in requests:
+            pending[request.token_uri].append(request)
+
+        async with self._async_session() as session:
+            documents = {document.uri: document for document in (await session.execute(
+                select(MetadataDocument).
+                where(MetadataDocument.uri.in_(pending.keys())))).scalars()}
+
+        now = datetime.now(timezone.utc)
+        fresh = {uri for uri, document in documents.items() if document.expires_at > now}
+        results = dict(zip(
+            [uri for uri in pending if uri not in fresh],
+            await asyncio.gather(
+                *[self._fetch(uri, documents.get(uri)) for uri in pending if uri not in fresh],
+                return_exceptions=True)))
+
+        async with self._async_session() as session:
+            for uri, requests in pending.items():
+                result = results.get(uri)
+                if isinstance(result, BaseException):
+                    logging.warning(f'metadata_failed(token_uri={uri}, error={result!r})')
+                    for request_id, _, _, attempts in requests:
+                        await session.execute(
+                            update(MetadataRequest).
+                            where(MetadataRequest.id == request_id).
+                            where(MetadataRequest.token_uri == uri).
+                            values(
+                                attempts=MetadataRequest.attempts + 1,
+                                not_before=func.now() + timedelta(seconds=min(MAX_BACKOFF, 10 * 2 ** attempts)),
+                                error=repr(result)))
+                    continue
+
+                if uri in fresh:
+                    content = documents[uri].content
+                else:
+                    content = await self._store(session, uri, documents.get(uri), result)
+
+                logging.warning(f'metadata(token_uri={uri}, tokens={len(requests)}, fetched={uri not in fresh})')
+                await session.execute(
+                    update(Token).
+                    where(Token.id.in_([token_id for _, token_id, _, _ in requests])).
+                    where(Token.token_uri == uri).
+                    values(**describe(content)))
+                await session.execute(
+                    delete(MetadataRequest).
+                    where(MetadataRequest.id.in_([request_id for request_id, _, _, _ in requests])).
+                    where(MetadataRequest.token_uri == uri))
+            await session.commit()
+
+    async def _revalidate(self, documents: list[MetadataDocument]):
+        if not documents:
+            return
+
+        results = await asyncio.gather(
+            *[self._fetch(document.uri, document) for document in documents],
+            return_exceptions=True)
+
+        async with self._async_session() as session:
+            for document, result in zip(documents, results):
+                if isinstance(result, BaseException):
+                    logging.warning(f'metadata_revalidate_failed(uri={document.uri}, error={result!r})')
+                    await session.execute(
+                        update(MetadataDocument).
+                        where(MetadataDocument.id == document.id).
+                        values(expires_at=func.now() + self._ttl))
+                    continue
+
+                if result is None or result.digest == document.digest:
+                    await self._store(session, document.uri, document, result)
+                    continue
+
+                logging.warning(f'metadata_changed(uri={document.uri})')
+                await self._store(session, document.uri, document, result)
+                await session.execute(
+                    update(Token).
+                    where(Token.token_uri == document.uri).
+                    values(**describe(result.content)))
+            await session.commit()
+
+    async def _fetch(self, uri: str, document: Optional[MetadataDocument]) -> Optional[Fetched]:
+        headers = {}
+        if document is not None and document.etag:
+            headers['If-None-Match'] = document.etag
+        if document is not None and document.last_modified:
+            headers['If-Modified-Since'] = document.last_modified
+
+        status, headers, body = await self._transport.exchange('GET', uri, headers=headers)
+        if status == HTTPStatus.NOT_MODIFIED and document is not None:
+            return None
+        if status != HTTPStatus.OK:
+            raise BadRequest(status_code=status, text=body.decode(errors='replace'))
+
+        digest = hashlib.sha256(body).hexdigest()
+        if document is not None and digest == document.digest:
+            return Fetched(document.content, digest, headers.get('ETag'), headers.get('Last-Modified'))
+
+        content = loads(body)
+        ERC721Metadata.validate(content)
+
+        return Fetched(content, digest, headers.get('ETag'), headers.get('Last-Modified'))
+
+    async def _store(
+            self,
+            session: AsyncSession,
+            uri: str,
+            document: Optional[MetadataDocument],
+            fetched: Optional[Fetched]) -> dict:
+        if fetched is None or (document is not None and fetched.digest == document.digest):
+            values = dict(expires_at=func.now() + self._ttl)
+            if fetched is not None:
+                values.update(etag=fetched.etag, last_modified=fetched.last_modified)
+            await session.execute(
+                update(MetadataDocument).
+                where(MetadataDocument.id == document.id).
+                values(**values))
+
+            return document.content
+
+        values = dict(
+            etag=fetched.etag,
+            last_modified=fetched.last_modified,
+            digest=fetched.digest,
+            content=fetched.content,
+            fetched_at=func.now(),
+            expires_at=func.now() + self._ttl)
+        await session.execute(
+            insert(MetadataDocument).
+            values(uri=uri, **values).
+            on_conflict_do_update(index_elements=[MetadataDocument.uri], set_=values))
+
+        return fetched.content
+
+
+def describe(content: dict) -> dict:
+    return dict(
+        asset_metadata=content,
+        name=content.get('name'),
+        description=content.get('description'),
+        image=content.get('image'))
+
+
+@click.command()
+@click.option('--concurrency', default=16, type=int)
+@click.option('--limit-per-host', default=4, type=int)
+@click.option('--timeout', default=10, type=float)
+@click.option('--retries', default=5, type=int)
+@click.option('--ttl', default=86400, type=float)
+def cli(concurrency: int, limit_per_host: int, timeout: float, retries: int, ttl: float):
+    from richmetas.globals import async_session
+
+    asyncio.run(MetadataWorker(async_session, concurrency, limit_per_host, timeout, retries, ttl).run())
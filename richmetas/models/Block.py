@@ -1,22 +1,30 @@
 from marshmallow import Schema, fields
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, Index
 from sqlalchemy.dialects.postgresql import JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 
 from .Base import Base
 
+FINAL_STATUSES = ['ACCEPTED_ON_L1', 'ACCEPTED_ONCHAIN']
+
 
 class Block(Base):
     __tablename__ = 'block'
 
     id = Column(Integer, primary_key=True, autoincrement=False)
     hash = Column(String, unique=True, nullable=False)
+    parent_hash = Column(String)
     timestamp = Column(DateTime(timezone=True), nullable=False)
-    _document = Column(JSON, nullable=False)
+    status = Column(String, nullable=False)
+    _document = deferred(Column(JSON))
+    _archive = Column(String)
 
     transactions = relationship('Transaction', back_populates='block')
 
 
+Index('ix_block_unfinalized', Block.id, postgresql_where=Block.status.notin_(FINAL_STATUSES))
+
+
 class BlockSchema(Schema):
     number = fields.Integer(attribute='id')
     hash = fields.String()
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String
+
+from .Base import Base
+
+CONTIGUOUS = 'contiguous'
+HEAD = 'head'
+
+
+class CrawlCheckpoint(Base):
+    __tablename__ = 'crawl_checkpoint'
+
+    id = Column(String, primary_key=True)
+    block_number = Column(Integer, nullable=False)
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, JSON, DateTime, func
+
+from .Base import Base
+
+
+class MetadataDocument(Base):
+    __tablename__ = 'metadata_document'
+
+    id = Column(Integer, primary_key=True)
+    uri = Column(String, nullable=False, unique=True)
+    etag = Column(String)
+    last_modified = Column(String)
+    digest = Column(String(64), nullable=False)
+    content = Column(JSON, nullable=False)
+    fetched_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, func
+from sqlalchemy.orm import relationship
+
+from .Base import Base
+
+
+class MetadataRequest(Base):
+    __tablename__ = 'metadata_request'
+
+    id = Column(Integer, primary_key=True)
+    token_id = Column(Integer, ForeignKey('token.id'), unique=True, nullable=False)
+    token_uri = Column(String, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    not_before = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    error = Column(String)
+
+    token = relationship('Token', back_populates='metadata_request')
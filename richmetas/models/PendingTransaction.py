@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, JSON
+
+from .Base import Base
+
+
+class PendingTransaction(Base):
+    __tablename__ = 'pending_transaction'
+
+    hash = Column(String, primary_key=True)
+    parent_block_hash = Column(String, nullable=False)
+    type = Column(String, nullable=False)
+    contract_address = Column(String, nullable=False)
+    entry_point_selector = Column(String)
+    entry_point_type = Column(String)
+    calldata = Column(JSON, nullable=False)
@@ -28,6 +28,7 @@ class Token(Base):
     latest_tx = relationship('Transaction')
     ask = relationship('LimitOrder', foreign_keys=ask_id, post_update=True)
     flows = relationship('TokenFlow', back_populates='token')
+    metadata_request = relationship('MetadataRequest', back_populates='token', uselist=False)
 
 
 class TokenSchema(Schema):
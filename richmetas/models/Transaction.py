@@ -1,5 +1,5 @@
 from marshmallow import Schema, fields
-from sqlalchemy import Column, Integer, String, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, JSON, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
 from richmetas.utils import parse_int
@@ -11,6 +11,8 @@ TYPE_DEPLOY = 'DEPLOY'
 
 class Transaction(Base):
     __tablename__ = 'transaction'
+    __table_args__ = (
+        Index('ix_transaction_block_number', 'block_number', 'transaction_index'),)
 
     id = Column(Integer, primary_key=True)
     hash = Column(String, unique=True, nullable=False)
@@ -21,6 +23,7 @@ class Transaction(Base):
     entry_point_selector = Column(String)
     entry_point_type = Column(String)
     calldata = Column(JSON, nullable=False)
+    l2_to_l1_messages = Column(JSON)
 
     block = relationship('Block', back_populates='transactions')
     contract = relationship('StarkContract', back_populates='transactions')
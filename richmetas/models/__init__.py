@@ -2,6 +2,8 @@ from marshmallow import fields
 
 from .Base import Base
 from .Block import Block
+from .CrawlCheckpoint import CrawlCheckpoint
+from .PendingTransaction import PendingTransaction
 from .StarkContract import StarkContract
 from .Transaction import Transaction
 
@@ -10,6 +12,8 @@ from .Balance import Balance
 from .Blueprint import Blueprint, BlueprintSchema
 from .Deposit import Deposit, DepositSchema
 from .LimitOrder import LimitOrder, LimitOrderSchema, State
+from .MetadataDocument import MetadataDocument
+from .MetadataRequest import MetadataRequest
 from .Token import Token, TokenSchema
 from .TokenContract import TokenContract, TokenContractSchema
 from .TokenFlow import TokenFlow, TokenFlowSchema, FlowType
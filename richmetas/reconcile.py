@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+import click
+from decouple import config
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload, sessionmaker
+from starkware.starknet.services.api.feeder_gateway.feeder_gateway_client import FeederGatewayClient
+
+from richmetas.contracts import StarkRichmetas
+from richmetas.models import Transfer
+from richmetas.scheduler import Backoff, Budget, Lane
+from richmetas.services import TransferService
+from richmetas.transport import supervise
+from richmetas.utils import Status, parse_int
+
+UNSETTLED = [Status.NOT_RECEIVED.value, Status.RECEIVED.value]
+IDLE = 5
+
+
+class Reconciler:
+    def __init__(
+            self,
+            async_session: sessionmaker,
+            feeder_gateway_client: FeederGatewayClient,
+            richmetas: StarkRichmetas,
+            concurrency: int = 16,
+            batch_size: int = 200,
+            budget: Optional[Budget] = None,
+            submit_budget: Optional[Budget] = None,
+            resubmit_interval: float = 60):
+        self._async_session = async_session
+        self._feeder_gateway_client = feeder_gateway_client
+        self._richmetas = richmetas
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._batch_size = batch_size
+        self._budget = budget
+        self._submit_budget = submit_budget
+        self._resubmit_interval = resubmit_interval
+        self._submitted: dict[int, float] = {}
+        self._cursor = 0
+
+    async def run(self):
+        backoff = Backoff(60)
+        while True:
+            try:
+                settled = await self.sweep()
+                backoff.reset()
+            except Exception as e:
+                logging.warning(f'reconcile_failed(error={e!r})')
+                await backoff.sleep()
+                continue
+
+            if self._cursor == 0:
+                logging.info(f'reconcile_pass(settled={settled})')
+                await asyncio.sleep(IDLE)
+
+    async def sweep(self) -> int:
+        async with self._async_session() as session:
+            transfers = (await session.execute(
+                select(Transfer.id, Transfer.hash, Transfer.status).
+                where(Transfer.status.in_(UNSETTLED)).
+                where(Transfer.id > self._cursor).
+                order_by(Transfer.id).
+                limit(self._batch_size))).all()
+        self._cursor = transfers[-1].id if len(transfers) == self._batch_size else 0
+        if self._cursor == 0:
+            now = time.monotonic()
+            self._submitted = {
+                transfer_id: submitted for transfer_id, submitted in self._submitted.items()
+                if now - submitted < self._resubmit_interval}
+        if not transfers:
+            return 0
+
+        statuses = await asyncio.gather(
+            *[self._poll(tx_hash) for _, tx_hash, _ in transfers],
+            return_exceptions=True)
+        outcomes = {}
+        now = time.monotonic()
+        for (transfer_id, tx_hash, status), polled in zip(transfers, statuses):
+            if isinstance(polled, BaseException):
+                logging.warning(f'poll_failed(hash={tx_hash}, error={polled!r})')
+                continue
+            if polled != Status.NOT_RECEIVED.value:
+                self._submitted.pop(transfer_id, None)
+                if polled != status:
+                    outcomes[transfer_id] = status, polled
+            elif now - self._submitted.get(transfer_id, -self._resubmit_interval) >= self._resubmit_interval:
+                outcomes[transfer_id] = status, polled
+
+        if not outcomes:
+            return 0
+
+        return await self._apply(outcomes)
+
+    async def _poll(self, tx_hash: str) -> str:
+        async with self._semaphore:
+            if self._budget is not None:
+                await self._budget.acquire(Lane.PENDING)
+
+            return (await self._feeder_gateway_client.get_transaction_status(tx_hash=tx_hash))['tx_status']
+
+    async def _resubmit(self, transfer: Transfer):
+        async with self._semaphore:
+            if self._submit_budget is not None:
+                await self._submit_budget.acquire(Lane.PENDING)
+
+            await self._richmetas.transfer(
+                int(transfer.from_account.stark_key),
+                int(transfer.to_account.stark_key),
+                int(transfer.amount),
+                transfer.contract.address,
+                int(transfer.nonce),
+                [int(transfer.signature_r), int(transfer.signature_s)])
+
+    async def _apply(self, outcomes: dict[int, tuple[str, str]]) -> int:
+        async with self._async_session() as session:
+            transfers = (await session.execute(
+                select(Transfer).
+                where(Transfer.id.in_(outcomes.keys())).
+                order_by(Transfer.id).
+                options(
+                    selectinload(Transfer.from_account),
+                    selectinload(Transfer.to_account),
+                    selectinload(Transfer.contract)).
+                with_for_update(of=Transfer, skip_locked=True))).scalars().all()
+
+            resubmits = []
+            settled = 0
+            transfer_service = TransferService(session)
+            for transfer in transfers:
+                status, polled = outcomes[transfer.id]
+                if transfer.status != status:
+                    continue
+
+                if polled == Status.NOT_RECEIVED.value:
+                    logging.warning(f'transfer(hash={transfer.hash})')
+                    resubmits.append(transfer)
+                    continue
+
+                if polled == Status.REJECTED.value:
+                    logging.warning(f'reject(hash={transfer.hash})')
+                    await transfer_service.reject(transfer)
+                else:
+                    logging.warning(f'update(hash={transfer.hash}, status={polled})')
+                    transfer.status = polled
+                settled += 1
+            await session.commit()
+
+        for transfer, result in zip(resubmits, await asyncio.gather(
+                *[self._resubmit(transfer) for transfer in resubmits],
+                return_exceptions=True)):
+            self._submitted[transfer.id] = time.monotonic()
+            if isinstance(result, BaseException):
+                logging.warning(f'resubmit_failed(hash={transfer.hash}, error={result!r})')
+
+        return settled
+
+
+@click.command()
+@click.option('--concurrency', default=16, type=int)
+@click.option('--batch-size', default=200, type=int)
+@click.option('--rate', default=None, type=float)
+@click.option('--burst', default=10, type=int)
+@click.option('--submit-rate', default=1, type=float)
+@click.option('--submit-burst', default=5, type=int)
+@click.option('--resubmit-interval', default=60, type=float)
+def cli(
+        concurrency: int,
+        batch_size: int,
+        rate: Optional[float],
+        burst: int,
+        submit_rate: float,
+        submit_burst: int,
+        resubmit_interval: float):
+    from richmetas.globals import async_session, feeder_gateway_client, gateway_client, transport
+
+    async def run():
+        await supervise(Reconciler(
+            async_session,
+            feeder_gateway_client,
+            StarkRichmetas(
+                config('STARK_RICHMETAS_CONTRACT_ADDRESS', cast=parse_int),
+                feeder_gateway_client,
+                gateway_client),
+            concurrency,
+            batch_size,
+            budget=Budget(rate, burst) if rate else None,
+            submit_budget=Budget(submit_rate, submit_burst) if submit_rate else None,
+            resubmit_interval=resubmit_interval).run(), transport)
+
+    asyncio.run(run())
@@ -0,0 +1,49 @@
+from datetime import datetime, timezone
+
+try:
+    from orjson import loads
+except ImportError:
+    from json import loads
+
+from richmetas.models.Transaction import TYPE_DEPLOY
+from richmetas.utils import parse_int
+
+
+class TransactionRecord:
+    __slots__ = (
+        'hash',
+        'index',
+        'type',
+        'contract_address',
+        'entry_point_selector',
+        'entry_point_type',
+        'calldata',
+        'l2_to_l1_messages',
+    )
+
+    def __init__(self, transaction: dict, receipt: dict):
+        assert receipt['transaction_hash'] == transaction['transaction_hash']
+        self.hash = transaction['transaction_hash']
+        self.index = receipt['transaction_index']
+        self.type = transaction['type']
+        self.contract_address = transaction['contract_address']
+        self.entry_point_selector = transaction.get('entry_point_selector')
+        self.entry_point_type = transaction.get('entry_point_type')
+        self.calldata = [*map(parse_int, transaction[
+            'calldata' if self.type != TYPE_DEPLOY else 'constructor_calldata'])]
+        self.l2_to_l1_messages = receipt.get('l2_to_l1_messages', [])
+
+
+class BlockRecord:
+    __slots__ = ('number', 'hash', 'parent_hash', 'timestamp', 'status', 'transactions', 'document')
+
+    def __init__(self, document: dict):
+        self.number = document['block_number']
+        self.hash = document['block_hash']
+        self.parent_hash = document['parent_block_hash']
+        self.timestamp = datetime.fromtimestamp(document['timestamp'], timezone.utc)
+        self.status = document['status']
+        self.transactions = [
+            TransactionRecord(transaction, receipt)
+            for transaction, receipt in zip(document['transactions'], document['transaction_receipts'])]
+        self.document = document
@@ -0,0 +1,86 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from enum import IntEnum
+from typing import Optional
+
+
+class Lane(IntEnum):
+    HEAD = 0
+    TARGET = 1
+    PENDING = 2
+    FINALITY = 3
+    BACKFILL = 4
+
+
+class Budget:
+    def __init__(self, rate: float, burst: int = 1):
+        self._rate = rate
+        self._burst = max(burst, 1)
+        self._tokens = float(self._burst)
+        self._stamp = time.monotonic()
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    async def acquire(self, lane: Lane):
+        self._refill()
+        if not self._waiters and self._tokens >= 1:
+            self._tokens -= 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (lane, next(self._sequence), waiter))
+        self._schedule()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._tokens += 1
+                self._schedule()
+            raise
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self._burst, self._tokens + (now - self._stamp) * self._rate)
+        self._stamp = now
+
+    def _schedule(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._dispatch()
+
+    def _dispatch(self):
+        self._timer = None
+        self._refill()
+        while self._waiters and self._tokens >= 1:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                self._tokens -= 1
+                waiter.set_result(None)
+
+        if self._waiters:
+            self._timer = asyncio.get_running_loop().call_later(
+                (1 - self._tokens) / self._rate, self._dispatch)
+
+
+class Backoff:
+    def __init__(self, cap: float, base: float = 1.0):
+        self._cap = cap
+        self._base = base
+        self._attempt = 0
+
+    def reset(self):
+        self._attempt = 0
+
+    def delay(self) -> float:
+        delay = random.uniform(0, min(self._cap, self._base * 2 ** self._attempt))
+        self._attempt = min(self._attempt + 1, 32)
+
+        return delay
+
+    async def sleep(self):
+        await asyncio.sleep(self.delay())
@@ -1,3 +1,4 @@
+import asyncio
 import functools
 from decimal import Decimal
 from typing import Union
@@ -13,20 +14,19 @@ from decouple import config
 from eth_account import Account
 from openapi_core import create_spec
 from rororo import OperationTableDef, setup_openapi, openapi_context
-from services.external_api.base_client import RetryConfig
 from sqlalchemy import select, desc, null, false, true
 from sqlalchemy.exc import NoResultFound, IntegrityError, MultipleResultsFound
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload, aliased
 from sqlalchemy.sql import functions
 from starkware.crypto.signature.fast_pedersen_hash import pedersen_hash
 from starkware.crypto.signature.signature import verify
 from starkware.starknet.definitions.general_config import StarknetGeneralConfig, StarknetChainId
-from starkware.starknet.services.api.feeder_gateway.feeder_gateway_client import FeederGatewayClient
-from starkware.starknet.services.api.gateway.gateway_client import GatewayClient
 from web3 import Web3
 
 from richmetas import utils
 from richmetas.contracts import Forwarder, ReqSchema, StarkRichmetas, LimitOrder, EtherRichmetas, ContractKind
+from richmetas.contracts.entry_points import ENTRY_POINTS, lookup
 from richmetas.services import TransferService
 from richmetas.utils import parse_int, Status
 
@@ -104,6 +104,11 @@ async def get_client(request: Request):
 
                 return web.json_response({'stark_key': '{:f}'.format(account.stark_key)})
             except NoResultFound:
+                for _, entry_point, call in await pending_calls(session, request.config_dict['richmetas'].address):
+                    if entry_point is ENTRY_POINTS['register_client'] and \
+                            utils.to_checksum_address(call.address) == address:
+                        return web.json_response({'stark_key': str(call.user)})
+
                 return web.HTTPNotFound()
 
 
@@ -533,8 +538,9 @@ async def transfer(request: Request):
                 context.parameters.query['signature']
             )
 
-        message_hash = functools.reduce(lambda x, y: pedersen_hash(y, x), reversed(tx.calldata[1:]), 0)
-        if not verify(message_hash, tx.signature[0], tx.signature[1], tx.calldata[0]):
+        call = ENTRY_POINTS['transfer'].decode(tx.calldata)
+        message_hash = functools.reduce(lambda x, y: pedersen_hash(y, x), reversed(call[1:]), 0)
+        if not verify(message_hash, tx.signature[0], tx.signature[1], call.from_):
             return web.HTTPUnauthorized()
 
         hash_ = '0x%x' % tx.calculate_hash(request.config_dict['starknet_general_config'])
@@ -544,7 +550,7 @@ async def transfer(request: Request):
                 return web.HTTPConflict()
         else:
             await TransferService(session).transfer(
-                hash_, tx.calldata[0], tx.calldata[1], tx.calldata[2], token_contract, tx.calldata[4], tx.signature)
+                hash_, call.from_, call.to_, call.amount_or_token_id, token_contract, call.nonce, tx.signature)
             await session.commit()
             await spawn(request, request.config_dict['gateway'].add_transaction(tx))
 
@@ -858,24 +864,62 @@ async def get_tx_status(request: Request):
 
 @operations.register
 async def inspect_tx(request: Request):
-    from starkware.starknet.public.abi import get_selector_from_name
-
     tx = await request.config_dict['feeder_gateway']. \
         get_transaction(tx_hash=request.match_info['hash'])
     if tx['status'] == Status.NOT_RECEIVED.value or \
-            parse_int(tx['transaction']['entry_point_selector']) != get_selector_from_name('transfer') or \
+            lookup(tx['transaction'].get('entry_point_selector')) is not ENTRY_POINTS['transfer'] or \
             tx['transaction']['entry_point_type'] != 'EXTERNAL':
         return web.HTTPNotFound()
 
+    call = ENTRY_POINTS['transfer'].decode(tx['transaction']['calldata'])
+
     return web.json_response({
         'function': 'transfer',
-        'inputs': dict(zip(
-            ['from', 'to', 'amount_or_token_id', 'contract', 'nonce'],
-            tx['transaction']['calldata'])),
+        'inputs': {field.rstrip('_'): str(value) for field, value in call._asdict().items()},
         'status': tx['status'],
     })
 
 
+@operations.register
+async def find_pending(request: Request):
+    with openapi_context(request) as context:
+        user = context.parameters.query.get('user')
+        contract = context.parameters.query.get('contract')
+        async with request.config_dict['async_session']() as session:
+            calls = await pending_calls(session, request.config_dict['richmetas'].address)
+
+        return web.json_response([
+            {
+                'transaction_hash': pending.hash,
+                'parent_block_hash': pending.parent_block_hash,
+                'function': entry_point.name,
+                'inputs': {field.rstrip('_'): str(value) for field, value in call._asdict().items()},
+            }
+            for pending, entry_point, call in calls
+            if (user is None or parse_int(user) in [
+                getattr(call, field) for field in ['user', 'from_', 'to_'] if hasattr(call, field)]) and
+            (contract is None or parse_int(contract) in [
+                getattr(call, field) for field in ['contract', 'base_contract', 'quote_contract']
+                if hasattr(call, field)])])
+
+
+async def pending_calls(session: AsyncSession, address: int) -> list:
+    from richmetas.models import PendingTransaction
+
+    calls = []
+    for pending in (await session.execute(select(PendingTransaction))).scalars():
+        if parse_int(pending.contract_address) != address or \
+                (entry_point := lookup(pending.entry_point_selector)) is None:
+            continue
+
+        try:
+            calls.append((pending, entry_point, entry_point.decode(pending.calldata)))
+        except TypeError:
+            continue
+
+    return calls
+
+
 async def upload(request: Request):
     import hashlib
     import pathlib
@@ -914,7 +958,7 @@ def authenticate(message: list[Union[int, str, bytes]], signature: list[str], st
 @click.option('--port', default=4000, type=int)
 def serve(port: int):
     from pathlib import Path
-    from .globals import async_session
+    from .globals import async_session, feeder_gateway_client, gateway_client, transport
 
     app = web.Application()
     w3 = Web3()
@@ -927,12 +971,8 @@ def serve(port: int):
         config('ETHER_RICHMETAS_CONTRACT_ADDRESS'),
         Account.from_key(config('ETHER_PRIVATE_KEY')),
         w3)
-    app['feeder_gateway'] = FeederGatewayClient(
-        url=config('FEEDER_GATEWAY_URL'),
-        retry_config=RetryConfig(n_retries=1))
-    app['gateway'] = GatewayClient(
-            url=config('GATEWAY_URL'),
-            retry_config=RetryConfig(n_retries=1))
+    app['feeder_gateway'] = feeder_gateway_client
+    app['gateway'] = gateway_client
     app['richmetas'] = StarkRichmetas(
         config('STARK_RICHMETAS_CONTRACT_ADDRESS', cast=parse_int),
         app['feeder_gateway'],
@@ -944,6 +984,18 @@ def serve(port: int):
         }[config('STARK_NETWORK')])
     app['async_session'] = async_session
 
+    async def report(_):
+        reporter = asyncio.create_task(transport.report())
+        yield
+        reporter.cancel()
+        try:
+            await reporter
+        except asyncio.CancelledError:
+            pass
+        await transport.close()
+
+    app.cleanup_ctx.append(report)
+
     app['bucket_root'] = Path(config('BUCKET_ROOT'))
     app.add_routes([web.post('/fs', upload),
                     web.static('/fs', app['bucket_root'])])
@@ -2,16 +2,48 @@ from decimal import Decimal
 from typing import Optional
 
 from sqlalchemy import select
-from sqlalchemy.exc import NoResultFound
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
+from richmetas.cache import LRUCache
 from richmetas.models import Account, Balance, TokenContract, Transfer
 from richmetas.utils import Status
 
 
 class TransferService:
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, cache: Optional[LRUCache] = None):
         self._session = session
+        self._cache = cache
+        self._accounts: dict[Decimal, Optional[Account]] = {}
+        self._balances: dict[tuple[Decimal, str], Optional[Balance]] = {}
+
+    async def prefetch(self, stark_keys: set[Decimal], contracts: list[TokenContract]):
+        stark_keys = {stark_key for stark_key in stark_keys if stark_key not in self._accounts}
+        for stark_key in [*stark_keys]:
+            if (account := await self._recall(stark_key)) is not None:
+                self._accounts[stark_key] = account
+                stark_keys.remove(stark_key)
+        if stark_keys:
+            self._accounts.update(dict.fromkeys(stark_keys))
+            for account in (await self._session.execute(
+                    select(Account).
+                    where(Account.stark_key.in_(stark_keys)))).scalars():
+                self._accounts[account.stark_key] = account
+
+        accounts = [account for account in self._accounts.values() if account is not None and account.id is not None]
+        contracts = [contract for contract in contracts if contract.id is not None]
+        if not accounts or not contracts:
+            return
+
+        for account in accounts:
+            for contract in contracts:
+                self._balances.setdefault((account.stark_key, contract.address), None)
+        for balance in (await self._session.execute(
+                select(Balance).
+                where(Balance.account_id.in_([account.id for account in accounts])).
+                where(Balance.contract_id.in_([contract.id for contract in contracts])).
+                options(selectinload(Balance.account), selectinload(Balance.contract)))).scalars():
+            self._balances[(balance.account.stark_key, balance.contract.address)] = balance
 
     async def transfer(
             self,
@@ -51,24 +83,46 @@ class TransferService:
         to_balance.amount -= transfer.amount
 
     async def lift_balance(self, account: Account, contract: TokenContract):
-        try:
+        key = Decimal(account.stark_key), contract.address
+        if key in self._balances:
+            balance = self._balances[key]
+        else:
             balance = (await self._session.execute(
                 select(Balance).
                 where(Balance.account == account).
-                where(Balance.contract == contract))).scalar_one()
-        except NoResultFound:
+                where(Balance.contract == contract))).scalar_one_or_none()
+        if balance is None:
             balance = Balance(account=account, contract=contract, amount=0)
             self._session.add(balance)
+        self._balances[key] = balance
 
         return balance
 
     async def lift_account(self, stark_key: int):
-        try:
+        key = Decimal(stark_key)
+        if key in self._accounts:
+            account = self._accounts[key]
+        elif (account := await self._recall(key)) is None:
             account = (await self._session.execute(
                 select(Account).
-                where(Account.stark_key == Decimal(stark_key)))).scalar_one()
-        except NoResultFound:
+                where(Account.stark_key == key))).scalar_one_or_none()
+        if account is None:
             account = Account(stark_key=stark_key)
             self._session.add(account)
+        self._accounts[key] = account
 
         return account
+
+    def retain(self):
+        if self._cache is None:
+            return
+
+        for stark_key, account in self._accounts.items():
+            if account is not None:
+                self._cache.put(('account', stark_key), account)
+
+    async def _recall(self, stark_key: Decimal) -> Optional[Account]:
+        if self._cache is None or (account := self._cache.get(('account', stark_key))) is None:
+            return None
+
+        return await self._session.merge(account, load=False)
@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from http import HTTPStatus
+from typing import Any, Awaitable, Iterator, Optional, Union
+from urllib.parse import parse_qs, urljoin
+
+import aiohttp
+from multidict import CIMultiDictProxy
+from services.external_api.base_client import BadRequest
+from starkware.starknet.services.api.feeder_gateway.feeder_gateway_client import \
+    FeederGatewayClient, get_formatted_block_identifier
+from starkware.starknet.services.api.gateway.gateway_client import GatewayClient
+
+from richmetas.cache import DiskCache
+from richmetas.models.Block import FINAL_STATUSES
+from richmetas.records import loads
+
+CACHEABLE_URIS = {'/get_block', '/get_transaction', '/get_transaction_receipt'}
+STATS_INTERVAL = 60
+
+
+class Transport:
+    def __init__(
+            self,
+            limit: int = 100,
+            limit_per_host: int = 0,
+            keepalive_timeout: float = 15,
+            timeout: Optional[float] = None):
+        self._limit = limit
+        self._limit_per_host = limit_per_host
+        self._keepalive_timeout = keepalive_timeout
+        self._timeout = aiohttp.ClientTimeout(total=timeout)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.requests = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.seconds = 0.
+        self.connections = 0
+        self.reuses = 0
+
+    async def session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is not None and self._loop is not loop:
+            session, self._session = self._session, None
+            await session.close()
+        if self._session is None or self._session.closed:
+            trace_config = aiohttp.TraceConfig()
+            trace_config.on_connection_create_end.append(self._on_connection_create)
+            trace_config.on_connection_reuseconn.append(self._on_connection_reuse)
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self._limit,
+                    limit_per_host=self._limit_per_host,
+                    keepalive_timeout=self._keepalive_timeout),
+                timeout=self._timeout,
+                trace_configs=[trace_config])
+            self._loop = loop
+
+        return self._session
+
+    async def request(self, method: str, url: str, **kwargs) -> tuple[int, str]:
+        with self._track():
+            async with (await self.session()).request(method=method, url=url, **kwargs) as response:
+                return response.status, await response.text()
+
+    async def exchange(self, method: str, url: str, **kwargs) -> tuple[int, CIMultiDictProxy, bytes]:
+        with self._track():
+            async with (await self.session()).request(method=method, url=url, **kwargs) as response:
+                return response.status, response.headers, await response.read()
+
+    async def close(self):
+        if self._session is not None:
+            session, self._session = self._session, None
+            await session.close()
+
+    def stats(self) -> dict:
+        return dict(
+            requests=self.requests,
+            failures=self.failures,
+            in_flight=self.in_flight,
+            seconds=self.seconds,
+            connections=self.connections,
+            reuses=self.reuses)
+
+    async def report(self, interval: float = STATS_INTERVAL):
+        reported = None
+        while True:
+            await asyncio.sleep(interval)
+            stats = self.stats()
+            if stats != reported:
+                logging.warning(f"transport({', '.join(f'{key}={value}' for key, value in stats.items())})")
+                reported = stats
+
+    @contextmanager
+    def _track(self) -> Iterator[None]:
+        self.requests += 1
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            yield
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self.failures += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self.seconds += time.perf_counter() - started
+
+    async def _on_connection_create(self, *_):
+        self.connections += 1
+
+    async def _on_connection_reuse(self, *_):
+        self.reuses += 1
+
+
+class PooledClient:
+    def __init__(self, transport: Transport, **kwargs):
+        super().__init__(**kwargs)
+        self._transport = transport
+
+    async def _send_request(
+            self, send_method: str, uri: str, data: Optional[Union[str, dict[str, Any]]] = None) -> str:
+        url = urljoin(base=self.url, url=self.format_uri(uri))
+        kwargs = dict(ssl=self.ssl_context) if self.ssl_context is not None else {}
+
+        limited_retries = self.retry_config.n_retries > 0
+        n_retries_left = self.retry_config.n_retries
+        while True:
+            n_retries_left -= 1
+            try:
+                status, text = await self._transport.request(send_method, url, data=data, **kwargs)
+                if status != HTTPStatus.OK:
+                    raise BadRequest(status_code=status, text=text)
+
+                return text
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if limited_retries and n_retries_left == 0:
+                    logging.error(f'Got {type(e).__name__}', exc_info=True)
+                    raise
+
+                logging.debug(f'Got {type(e).__name__}, retrying...', exc_info=True)
+            except BadRequest as e:
+                if limited_retries and (n_retries_left == 0 or e.status_code not in self.retry_config.retry_codes):
+                    raise
+
+                logging.debug(f'Got {e!r} while trying to access {url}, retrying...')
+
+            await asyncio.sleep(1)
+
+
+class PooledFeederGatewayClient(PooledClient, FeederGatewayClient):
+    def __init__(self, transport: Transport, cache: Optional[DiskCache] = None, **kwargs):
+        super().__init__(transport, **kwargs)
+        self._cache = cache
+
+    async def get_block(self, block_hash=None, block_number=None) -> dict:
+        return loads(await self._send_request(
+            send_method='GET',
+            uri=f'/get_block?{get_formatted_block_identifier(block_hash=block_hash, block_number=block_number)}'))
+
+    async def _send_request(
+            self, send_method: str, uri: str, data: Optional[Union[str, dict[str, Any]]] = None) -> str:
+        if self._cache is None or send_method != 'GET' or not cacheable(uri):
+            return await super()._send_request(send_method, uri, data)
+
+        url = urljoin(base=self.url, url=self.format_uri(uri))
+        if (text := self._cache.get(url)) is not None:
+            return text
+
+        text = await super()._send_request(send_method, uri, data)
+        self._cache.put(url, text, loads(text).get('status') in FINAL_STATUSES)
+
+        return text
+
+
+class PooledGatewayClient(PooledClient, GatewayClient):
+    pass
+
+
+async def supervise(main: Awaitable, transport: Transport, interval: float = STATS_INTERVAL):
+    reporter = asyncio.create_task(transport.report(interval))
+    try:
+        return await main
+    finally:
+        reporter.cancel()
+        try:
+            await reporter
+        except asyncio.CancelledError:
+            pass
+        await transport.close()
+
+
+def cacheable(uri: str) -> bool:
+    path, _, query = uri.partition('?')
+    if path not in CACHEABLE_URIS:
+        return False
+
+    query = parse_qs(query)
+    if 'blockNumber' in query:
+        return query['blockNumber'][0].isdigit()
+
+    return 'blockHash' in query or 'transactionHash' in query
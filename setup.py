@@ -25,10 +25,16 @@ setup(
         'rororo',
         'sqlalchemy',
     ],
+    extras_require={
+        'orjson': ['orjson'],
+        'zstd': ['zstandard'],
+    },
     entry_points={
         'console_scripts': [
             'crawl = richmetas.crawl:crawl',
             'interpret = richmetas.interpret:cli',
+            'metadata = richmetas.metadata:cli',
+            'reconcile = richmetas.reconcile:cli',
             'serve = richmetas.serve:serve',
             'stark = richmetas.stark_key:cli',
             'ether_monitor = richmetas.ether_monitor:cli',